@@ -1,20 +1,56 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException
+from typing import Optional
+from fastapi import APIRouter, UploadFile, File, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import FileResponse
-from app.models.schemas import ImageUploadResponse
+from app.models.schemas import ImageUploadResponse, IndexStatus, BulkIngestResult
 from app.services.clip_service import clip_service
-from app.services.vector_store import vector_store
+from app.api.streaming import ndjson_response
+from app.services.vector_store import async_vector_store
+from app.services.migration import migration_service
+from app.services.indexing_queue import indexing_queue, IndexJob
+from app.services.ingest import extract_upload
+from app.services.phash_index import phash_index
+from app.services.thumbnail_service import thumbnail_service, etag_for, etag_matches, FORMATS
 from app.config import settings
+import asyncio
+import hashlib
 import uuid
 
 router = APIRouter()
 
 
 @router.get("/file/{filename}")
-async def get_image(filename: str):
+async def get_image(
+    request: Request,
+    filename: str,
+    w: Optional[int] = Query(
+        None,
+        ge=16,
+        le=4096,
+        description=(
+            "Resize to this width, rounded up to the nearest configured thumbnail "
+            "size; wider requests get the full-resolution image"
+        ),
+    ),
+    format: Optional[str] = Query(None, pattern="^(webp|jpeg)$"),
+):
     file_path = settings.images_dir / filename
     if not file_path.exists():
         raise HTTPException(status_code=404, detail="Image not found")
-    return FileResponse(file_path)
+
+    media_type = None
+    if w is not None or format is not None:
+        file_path = await run_in_threadpool(thumbnail_service.get_variant, file_path, w, format)
+        media_type = FORMATS[format or settings.thumbnail_format][1]
+
+    etag = etag_for(file_path)
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={settings.image_cache_max_age}",
+    }
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return FileResponse(file_path, media_type=media_type, headers=headers)
 
 
 @router.post("/upload", response_model=ImageUploadResponse)
@@ -29,32 +65,142 @@ async def upload_image(file: UploadFile = File(...)):
     file_path = settings.images_dir / filename
 
     settings.images_dir.mkdir(parents=True, exist_ok=True)
-    content = await file.read()
-    file_path.write_bytes(content)
+    digest = hashlib.sha256()
+    out = await run_in_threadpool(open, file_path, "wb")
+    try:
+        while chunk := await file.read(settings.upload_chunk_size):
+            digest.update(chunk)
+            await run_in_threadpool(out.write, chunk)
+    except Exception:
+        out.close()
+        file_path.unlink(missing_ok=True)
+        raise
+    await run_in_threadpool(out.close)
 
-    embedding = clip_service.get_image_embedding(file_path, model_id)
-    vector_store.upsert(
-        model_id=model_id,
-        id=image_id,
-        vector=embedding,
-        payload={"filename": filename, "path": str(file_path)},
+    sha256 = digest.hexdigest()
+
+    try:
+        duplicate = await run_in_threadpool(phash_index.check_and_add, file_path, filename)
+    except Exception:
+        duplicate = None  # undecodable here; the indexer will report it
+    if duplicate is not None:
+        file_path.unlink(missing_ok=True)
+        return ImageUploadResponse(
+            id=image_id,
+            filename=duplicate,
+            message=f"Near-duplicate of {duplicate}, not indexed",
+            status="duplicate",
+            sha256=sha256,
+            duplicate_of=duplicate,
+        )
+
+    await indexing_queue.submit(
+        IndexJob(
+            image_id=image_id,
+            model_id=model_id,
+            path=file_path,
+            payload={"filename": filename, "path": str(file_path), "sha256": sha256},
+        )
     )
 
     return ImageUploadResponse(
         id=image_id,
         filename=filename,
-        message="Image uploaded and indexed successfully",
+        message="Image uploaded, indexing in background",
+        status="pending",
+        sha256=sha256,
     )
 
 
+@router.post("/bulk")
+async def bulk_ingest(files: list[UploadFile] = File(...)):
+    """Ingest many images or zip/tar archives, streaming per-file NDJSON results."""
+    model_id = clip_service.get_current_model_id()
+
+    def extract(upload: UploadFile) -> list[dict]:
+        # Keep files saved before a failure so they are still indexed.
+        results = []
+        try:
+            for item in extract_upload(upload.file, upload.filename or "", upload.content_type):
+                results.append(item)
+        except Exception as e:
+            results.append({"name": upload.filename or "", "id": None, "path": None, "error": str(e)})
+        return results
+
+    extracted = []
+    for upload in files:
+        extracted.extend(await run_in_threadpool(extract, upload))
+
+    async def result_stream():
+        loop = asyncio.get_running_loop()
+        pending = []
+        for item in extracted:
+            if item["error"] is not None:
+                yield BulkIngestResult(
+                    name=item["name"], status="failed", error=item["error"]
+                )
+                continue
+            if item.get("duplicate_of"):
+                yield BulkIngestResult(
+                    name=item["name"],
+                    status="duplicate",
+                    sha256=item["sha256"],
+                    duplicate_of=item["duplicate_of"],
+                )
+                continue
+
+            path = item["path"]
+            job = IndexJob(
+                image_id=item["id"],
+                model_id=model_id,
+                path=path,
+                payload={"filename": path.name, "path": str(path), "sha256": item["sha256"]},
+                done=loop.create_future(),
+            )
+            await indexing_queue.submit(job)
+            pending.append((item["name"], job))
+
+        async def wait(name: str, job: IndexJob) -> BulkIngestResult:
+            status = await job.done
+            return BulkIngestResult(
+                name=name,
+                id=job.image_id,
+                filename=job.path.name,
+                status=status["status"],
+                error=status["error"],
+                sha256=job.payload["sha256"],
+            )
+
+        for next_result in asyncio.as_completed([wait(n, j) for n, j in pending]):
+            yield await next_result
+
+    return ndjson_response(result_stream())
+
+
+@router.get("/status/{image_id}", response_model=IndexStatus)
+async def get_index_status(image_id: str):
+    status = indexing_queue.get_status(image_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Unknown upload")
+    return IndexStatus(**status)
+
+
 @router.get("/")
 async def list_images():
     model_id = clip_service.get_current_model_id()
-    return vector_store.list_all(model_id)
+    return await async_vector_store.list_all(model_id)
 
 
 @router.delete("/{image_id}")
 async def delete_image(image_id: str):
     model_id = clip_service.get_current_model_id()
-    vector_store.delete(model_id, image_id)
+    payload = await async_vector_store.get_payload(model_id, image_id)
+    await async_vector_store.delete(model_id, image_id)
+    mirror = migration_service.mirror_target(model_id)
+    if mirror:
+        await async_vector_store.delete(mirror, image_id)
+    if payload and payload.get("filename"):
+        await async_vector_store.delete_faces(payload["filename"])
+        # Otherwise re-uploading the same photo would be rejected as a duplicate.
+        await run_in_threadpool(phash_index.remove, payload["filename"])
     return {"message": f"Image {image_id} deleted"}
@@ -7,7 +7,10 @@ from pydantic import BaseModel
 
 from app.models.clip_models import MODEL_REGISTRY
 from app.services.clip_service import clip_service
-from app.services.vector_store import vector_store
+from app.services.vector_store import vector_store, async_vector_store, get_index_config
+from app.services.thumbnail_service import thumbnail_service
+from app.services.phash_index import phash_index
+from app.services.migration import migration_service
 from app.config import settings
 
 router = APIRouter()
@@ -28,9 +31,14 @@ class SetModelRequest(BaseModel):
     model_id: str
 
 
+class MigrationRequest(BaseModel):
+    model_id: str
+    drop_old: bool = False
+
+
 @router.get("/", response_model=list[ModelInfo])
 async def list_models():
-    indexed_models = {m["model_id"]: m for m in vector_store.list_indexed_models()}
+    indexed_models = {m["model_id"]: m for m in await async_vector_store.list_indexed_models()}
 
     models = []
     for model_id, config in MODEL_REGISTRY.items():
@@ -54,7 +62,7 @@ async def list_models():
 async def get_current_model():
     model_id = clip_service.get_current_model_id()
     config = MODEL_REGISTRY[model_id]
-    indexed = vector_store.get_collection_info(model_id)
+    indexed = await async_vector_store.get_collection_info(model_id)
 
     return {
         "model_id": model_id,
@@ -70,10 +78,60 @@ async def set_current_model(request: SetModelRequest):
     if request.model_id not in MODEL_REGISTRY:
         raise HTTPException(status_code=400, detail="Unknown model")
 
-    clip_service.set_current_model(request.model_id)
+    try:
+        await migration_service.set_current(request.model_id)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"Could not update the current model: {e}")
     return {"model_id": request.model_id, "status": "set"}
 
 
+@router.post("/migrate")
+async def start_migration(request: MigrationRequest):
+    """Re-index into ``model_id`` in the background, then switch to it.
+
+    Uploads are written to both models until the switch, so search never
+    sees a partially filled collection and no new image is missed.
+    """
+    try:
+        return await migration_service.start(request.model_id, drop_old=request.drop_old)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"Could not start the migration: {e}")
+
+
+@router.get("/migrate")
+async def get_migration_status():
+    return migration_service.get_status()
+
+
+@router.post("/migrate/cancel")
+async def cancel_migration():
+    await migration_service.cancel()
+    return migration_service.get_status()
+
+
+@router.get("/index-config/{model_id:path}")
+async def get_index_config_for_model(model_id: str):
+    if model_id not in MODEL_REGISTRY:
+        raise HTTPException(status_code=400, detail="Unknown model")
+    return {"model_id": model_id, **get_index_config(model_id)}
+
+
+@router.post("/index-config/{model_id:path}")
+async def apply_index_config(model_id: str):
+    """Apply the configured HNSW/on-disk settings to the model's existing collection."""
+    if model_id not in MODEL_REGISTRY:
+        raise HTTPException(status_code=400, detail="Unknown model")
+    loop = asyncio.get_event_loop()
+    applied = await loop.run_in_executor(None, vector_store.apply_index_config, model_id)
+    return {"model_id": model_id, **applied}
+
+
 @router.get("/load/{model_id}/stream")
 async def load_model_stream(model_id: str):
     if model_id not in MODEL_REGISTRY:
@@ -122,6 +180,9 @@ async def index_with_model_stream(model_id: str):
                 image_id = str(uuid.uuid4())
 
                 def process_image():
+                    duplicate = phash_index.check_and_add(img_path, img_path.name)
+                    if duplicate is not None:
+                        return duplicate
                     embedding = clip_service.get_image_embedding(img_path, model_id)
                     vector_store.upsert(
                         model_id=model_id,
@@ -129,8 +190,13 @@ async def index_with_model_stream(model_id: str):
                         vector=embedding,
                         payload={"filename": img_path.name, "path": str(img_path)},
                     )
+                    thumbnail_service.generate_defaults(img_path)
+                    return None
 
-                await loop.run_in_executor(None, process_image)
+                duplicate = await loop.run_in_executor(None, process_image)
+                if duplicate is not None:
+                    yield f"data: {json.dumps({'status': 'duplicate', 'current': i + 1, 'total': total, 'file': img_path.name, 'duplicate_of': duplicate})}\n\n"
+                    continue
 
                 yield f"data: {json.dumps({'status': 'indexing', 'current': i + 1, 'total': total, 'file': img_path.name})}\n\n"
             except Exception as e:
@@ -1,9 +1,10 @@
 from typing import Optional
 from fastapi import APIRouter, Query
+from fastapi.concurrency import run_in_threadpool
 from app.models.schemas import SearchResponse, SearchResult
 from app.models.clip_models import MODEL_REGISTRY
 from app.services.clip_service import clip_service
-from app.services.vector_store import vector_store
+from app.services.vector_store import async_vector_store
 
 router = APIRouter()
 
@@ -13,11 +14,16 @@ async def semantic_search(
     q: str = Query(..., description="Search query (e.g., 'smiling', 'concert')"),
     limit: int = Query(12, ge=1, le=50),
     model: Optional[str] = Query(None, description="Model ID to use (defaults to current)"),
+    ef: Optional[int] = Query(None, ge=1, le=4096, description="HNSW search breadth (higher = better recall, slower)"),
+    exact: bool = Query(False, description="Exact brute-force search, bypassing the index"),
 ):
     model_id = model if model and model in MODEL_REGISTRY else clip_service.get_current_model_id()
 
-    text_embedding = clip_service.get_text_embedding(q, model_id)
-    results = vector_store.search(model_id=model_id, vector=text_embedding, limit=limit)
+    # Text encoding (or its model-server round trip) blocks; keep it off the event loop.
+    text_embedding = await run_in_threadpool(clip_service.get_text_embedding, q, model_id)
+    results = await async_vector_store.search(
+        model_id=model_id, vector=text_embedding, limit=limit, ef=ef, exact=exact
+    )
 
     return SearchResponse(
         query=q,
@@ -1,8 +1,16 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException
-from app.models.schemas import VerifyResponse
-from app.services.face_service import face_service
-import tempfile
-from pathlib import Path
+import asyncio
+from concurrent.futures.process import BrokenProcessPool
+from fastapi import APIRouter, UploadFile, File, HTTPException, Query
+from app.models.schemas import (
+    VerifyResponse,
+    BatchVerifyResult,
+    GalleryMatch,
+    GalleryMatchResponse,
+)
+from app.api.streaming import ndjson_response
+from app.services.face_service import face_service, detect_and_encode_with_metrics
+from app.utils import metrics
+from typing import Optional
 
 router = APIRouter()
 
@@ -16,16 +24,112 @@ async def verify_joyuri(
     if not file.content_type.startswith("image/"):
         raise HTTPException(status_code=400, detail="File must be an image")
 
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".jpg") as tmp:
+    content = await file.read()
+    result = face_service.verify(content, threshold=threshold)
+    return VerifyResponse(**result)
+
+
+@router.post("/batch")
+async def verify_batch(
+    files: list[UploadFile] = File(...),
+    threshold: float = 0.6,
+):
+    """Verify many images in parallel, streaming NDJSON results as they finish."""
+    for file in files:
+        if not file.content_type or not file.content_type.startswith("image/"):
+            raise HTTPException(
+                status_code=400, detail=f"File must be an image: {file.filename}"
+            )
+
+    loop = asyncio.get_running_loop()
+
+    async def encode(content: bytes):
+        for attempt in range(2):
+            pool = face_service.get_pool()
+            try:
+                return await loop.run_in_executor(
+                    pool, detect_and_encode_with_metrics, content
+                )
+            except BrokenProcessPool:
+                # Another job killed a worker; retry once on a fresh pool.
+                face_service.discard_pool(pool)
+                if attempt:
+                    raise
+
+    async def run(index: int, filename: str, content: bytes) -> BatchVerifyResult:
+        try:
+            key = face_service.content_key(content)
+            entry = face_service.cache_get(key)
+            if entry is None:
+                entry, samples = await encode(content)
+                metrics.replay(samples)
+                face_service.cache_put(key, entry)
+            _, encodings = entry
+            result = face_service.match_encodings(encodings, threshold=threshold)
+            return BatchVerifyResult(index=index, filename=filename, **result)
+        except Exception as e:
+            return BatchVerifyResult(
+                index=index,
+                filename=filename,
+                is_joyuri=False,
+                confidence=0.0,
+                faces_detected=0,
+                message="Verification failed",
+                error=str(e),
+            )
+
+    tasks = []
+    for index, file in enumerate(files):
         content = await file.read()
-        tmp.write(content)
-        tmp_path = Path(tmp.name)
-
-    try:
-        result = face_service.verify(tmp_path, threshold=threshold)
-        return VerifyResponse(**result)
-    finally:
-        tmp_path.unlink()
+        tasks.append(asyncio.ensure_future(run(index, file.filename or "", content)))
+
+    async def result_stream():
+        try:
+            for next_result in asyncio.as_completed(tasks):
+                yield await next_result
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    return ndjson_response(result_stream())
+
+
+@router.get("/gallery", response_model=GalleryMatchResponse)
+async def find_in_gallery(
+    threshold: float = 0.6,
+    limit: int = Query(50, ge=1, le=500),
+):
+    """List indexed gallery images whose faces match the reference set."""
+    loop = asyncio.get_running_loop()
+    matches = await loop.run_in_executor(
+        None, lambda: face_service.search_gallery(threshold=threshold, limit=limit)
+    )
+    return GalleryMatchResponse(
+        threshold=threshold,
+        references=face_service.reference_count(),
+        results=[
+            GalleryMatch(**m, url=f"/api/images/file/{m['filename']}") for m in matches
+        ],
+    )
+
+
+@router.post("/compact-references")
+async def compact_references(
+    max_prototypes: Optional[int] = Query(None, ge=1),
+    merge_distance: Optional[float] = Query(None, gt=0),
+    threshold: float = 0.6,
+    dry_run: bool = False,
+):
+    """Cluster reference encodings into a bounded set of prototypes.
+
+    Reference images of dropped encodings are moved to ``reference/archived``.
+    """
+    return face_service.compact_references(
+        max_prototypes=max_prototypes,
+        merge_distance=merge_distance,
+        threshold=threshold,
+        dry_run=dry_run,
+    )
 
 
 @router.post("/add-reference")
@@ -0,0 +1,26 @@
+from typing import AsyncGenerator
+
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+
+def ndjson_response(results: AsyncGenerator[BaseModel, None]) -> StreamingResponse:
+    """Stream results as NDJSON, one line per model as soon as it is yielded.
+
+    Uploaded files are closed once the handler returns, so read or extract
+    them before calling this; only work that no longer needs the upload may
+    continue while the response streams.
+    """
+    async def lines():
+        try:
+            async for result in results:
+                yield result.model_dump_json() + "\n"
+        finally:
+            # Run the producer's cleanup right away if the client disconnects.
+            await results.aclose()
+
+    return StreamingResponse(
+        lines(),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
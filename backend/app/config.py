@@ -7,18 +7,67 @@ class Settings(BaseSettings):
     qdrant_host: str = "localhost"
     qdrant_port: int = 6333
     qdrant_collection: str = "joyuri_images"
+    qdrant_grpc_port: int = 6334
+    qdrant_prefer_grpc: bool = False
+    qdrant_timeout: int = 10  # seconds
+    qdrant_max_connections: int = 100  # async client connection pool size
+    qdrant_retries: int = 2  # retries of transient errors in the async client
+    qdrant_retry_backoff: float = 0.2  # seconds, doubled per retry
+
+    # Qdrant index tuning; per-model overrides keyed by model id, e.g.
+    # {"openai/ViT-L-14": {"hnsw_m": 32, "on_disk_vectors": true}}
+    hnsw_m: int = 16
+    hnsw_ef_construct: int = 100
+    hnsw_search_ef: int = 128
+    on_disk_vectors: bool = False
+    on_disk_payload: bool = False
+    collection_index_overrides: dict[str, dict] = {}
 
     # Storage paths
     images_dir: Path = Path("data/images")
     reference_dir: Path = Path("data/reference")
+    thumbnails_dir: Path = Path("data/thumbnails")
+    phash_index_file: Path = Path("data/phash.txt")
+    scrape_state_file: Path = Path("data/scrape_state.db")
+
+    # Image serving
+    thumbnail_sizes: list[int] = [256, 512]
+    thumbnail_format: str = "webp"
+    thumbnail_quality: int = 80
+    image_cache_max_age: int = 86400
+
+    # Uploads and background indexing
+    upload_chunk_size: int = 1024 * 1024
+    indexing_batch_size: int = 16
+    indexing_batch_wait: float = 0.5  # seconds to wait for a batch to fill
+    indexing_queue_size: int = 1000
+    indexing_status_history: int = 10000
+    bulk_max_files: int = 10000  # per archive
+
+    # Near-duplicate detection (64-bit dHash)
+    phash_enabled: bool = True
+    phash_max_distance: int = 6
 
     # CLIP (multi-model support)
     default_clip_model: str = "openai/ViT-B-32"
     clip_models_cache_dir: Path = Path("data/models")
     max_loaded_models: int = 2
+    # Unix socket of a shared model server; empty = load models in-process
+    model_server_socket: str = ""
+    # In-process embedding dtype; converted to float32 lists only at the Qdrant client
+    embedding_dtype: str = "float32"  # or "float16" to halve batch memory
+    # How often workers re-read the current/migration collection aliases
+    alias_refresh_interval: float = 5.0  # seconds
 
     # Face recognition
     face_recognition_tolerance: float = 0.6
+    face_workers: int = 0  # 0 = one worker per CPU core
+    face_detection_model: str = "hog"  # "hog" (CPU) or "cnn" (dlib CUDA build)
+    face_detection_upsample: int = 1
+    face_detection_max_side: int = 800  # 0 = detect at full resolution
+    face_reference_max_prototypes: int = 32
+    face_reference_merge_distance: float = 0.35
+    face_cache_size: int = 1024  # cached detections for repeat submissions
 
     class Config:
         env_file = ".env"
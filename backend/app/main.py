@@ -1,12 +1,34 @@
-from fastapi import FastAPI
+import time
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 
 from app.api.routes import search, verify, images, models
+from app.services.face_service import face_service
+from app.services.indexing_queue import indexing_queue
+from app.services.migration import migration_service
+from app.services.vector_store import async_vector_store
+from app.utils import metrics
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    indexing_queue.start()
+    await migration_service.start_refresher()
+    yield
+    await migration_service.stop()
+    await indexing_queue.stop()
+    face_service.shutdown()
+    await async_vector_store.close()
+
 
 app = FastAPI(
     title="Jo Yuri Image Recognition",
     description="Semantic search and face verification for Jo Yuri images",
     version="0.1.0",
+    lifespan=lifespan,
 )
 
 app.add_middleware(
@@ -17,6 +39,34 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+QUEUE_DEPTHS = {
+    "indexing": indexing_queue.depth,
+    "face_pool": face_service.pool_backlog,
+}
+metrics.QUEUE_DEPTH.set_function(
+    lambda: {(name,): depth() for name, depth in QUEUE_DEPTHS.items()}
+)
+
+
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # Label by route template, not raw path, to keep cardinality bounded.
+        route = request.scope.get("route")
+        metrics.HTTP_REQUEST_SECONDS.observe(
+            time.perf_counter() - start,
+            method=request.method,
+            route=getattr(route, "path", "unmatched"),
+            status=status,
+        )
+
+
 app.include_router(images.router, prefix="/api/images", tags=["images"])
 app.include_router(search.router, prefix="/api/search", tags=["search"])
 app.include_router(verify.router, prefix="/api/verify", tags=["verify"])
@@ -26,3 +76,9 @@ app.include_router(models.router, prefix="/api/models", tags=["models"])
 @app.get("/health")
 async def health_check():
     return {"status": "healthy"}
+
+
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
@@ -18,6 +18,7 @@ class CLIPModelConfig:
     model_name: str
     pretrained: Optional[str]
     description: str
+    image_size: int = 224  # input resolution; images are decoded just above it
 
 
 MODEL_REGISTRY: dict[str, CLIPModelConfig] = {
@@ -83,6 +84,7 @@ MODEL_REGISTRY: dict[str, CLIPModelConfig] = {
         model_name="google/siglip-large-patch16-384",
         pretrained=None,
         description="High-res SigLIP model",
+        image_size=384,
     ),
 }
 
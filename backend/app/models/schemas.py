@@ -6,6 +6,25 @@ class ImageUploadResponse(BaseModel):
     id: str
     filename: str
     message: str
+    status: str = "indexed"
+    sha256: Optional[str] = None
+    duplicate_of: Optional[str] = None
+
+
+class IndexStatus(BaseModel):
+    id: str
+    status: str
+    error: Optional[str] = None
+
+
+class BulkIngestResult(BaseModel):
+    name: str
+    id: Optional[str] = None
+    filename: Optional[str] = None
+    status: str
+    error: Optional[str] = None
+    sha256: Optional[str] = None
+    duplicate_of: Optional[str] = None
 
 
 class SearchQuery(BaseModel):
@@ -36,6 +55,33 @@ class VerifyResponse(BaseModel):
     message: str
 
 
+class BatchVerifyResult(VerifyResponse):
+    index: int
+    filename: str
+    error: Optional[str] = None
+
+
+class FaceBox(BaseModel):
+    top: int
+    right: int
+    bottom: int
+    left: int
+
+
+class GalleryMatch(BaseModel):
+    filename: str
+    distance: float
+    confidence: float
+    box: Optional[FaceBox] = None
+    url: Optional[str] = None
+
+
+class GalleryMatchResponse(BaseModel):
+    threshold: float
+    references: int
+    results: list[GalleryMatch]
+
+
 class ScrapeRequest(BaseModel):
     pinterest_url: str
     max_images: int = 50
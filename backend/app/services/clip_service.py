@@ -1,6 +1,6 @@
+import numpy as np
 import torch
 from PIL import Image
-from pathlib import Path
 from typing import Optional, Callable
 from collections import OrderedDict
 from abc import ABC, abstractmethod
@@ -13,21 +13,71 @@ from app.models.clip_models import (
     ModelFamily,
     get_model_config,
 )
+from app.utils.images import ImageSource, open_image
+from app.utils.metrics import stage_timer, MODEL_MEMORY_BYTES
 
 
 class ModelLoader(ABC):
+    """Loads one model family and encodes images/text into unit-norm embeddings.
+
+    Subclasses implement the model-specific preprocessing and forward passes;
+    the shared encode methods time each stage and normalise the output.
+    """
+
+    model = None
+    model_id: str = ""
+    device: Optional[str] = None
+
     @abstractmethod
     def load(self, config: CLIPModelConfig, device: str) -> None:
         pass
 
     @abstractmethod
-    def encode_image(self, image: Image.Image) -> list[float]:
+    def _preprocess_images(self, images: list[Image.Image]):
+        pass
+
+    @abstractmethod
+    def _forward_images(self, inputs) -> torch.Tensor:
         pass
 
     @abstractmethod
-    def encode_text(self, text: str) -> list[float]:
+    def _tokenize(self, texts: list[str]):
         pass
 
+    @abstractmethod
+    def _forward_text(self, inputs) -> torch.Tensor:
+        pass
+
+    def _normalize(self, embeddings: torch.Tensor) -> np.ndarray:
+        """Unit-normalise on the device and return one contiguous (n, d) array."""
+        # .cpu() waits for the device, so GPU forward time lands here.
+        with stage_timer("normalize", self.model_id):
+            embeddings = embeddings / embeddings.norm(dim=-1, keepdim=True)
+            dtype = torch.float16 if settings.embedding_dtype == "float16" else torch.float32
+            return np.ascontiguousarray(embeddings.to(dtype).cpu().numpy())
+
+    def encode_images(self, images: list[Image.Image]) -> np.ndarray:
+        with stage_timer("preprocess", self.model_id):
+            inputs = self._preprocess_images(images)
+        with torch.no_grad(), stage_timer("forward", self.model_id):
+            embeddings = self._forward_images(inputs)
+        return self._normalize(embeddings)
+
+    def encode_image(self, image: Image.Image) -> np.ndarray:
+        return self.encode_images([image])[0]
+
+    def encode_text(self, text: str) -> np.ndarray:
+        with stage_timer("tokenize", self.model_id):
+            inputs = self._tokenize([text])
+        with torch.no_grad(), stage_timer("forward_text", self.model_id):
+            embeddings = self._forward_text(inputs)
+        return self._normalize(embeddings)[0]
+
+    def memory_bytes(self) -> int:
+        if self.model is None:
+            return 0
+        return sum(p.numel() * p.element_size() for p in self.model.parameters())
+
     def unload(self) -> None:
         pass
 
@@ -41,6 +91,7 @@ class OpenAICLIPLoader(ModelLoader):
     def load(self, config: CLIPModelConfig, device: str) -> None:
         import clip
 
+        self.model_id = config.id
         self.device = device
         self.model, self.preprocess = clip.load(
             config.model_name,
@@ -49,21 +100,19 @@ class OpenAICLIPLoader(ModelLoader):
         )
         self.model.eval()
 
-    def encode_image(self, image: Image.Image) -> list[float]:
-        image_input = self.preprocess(image).unsqueeze(0).to(self.device)
-        with torch.no_grad():
-            embedding = self.model.encode_image(image_input)
-            embedding = embedding / embedding.norm(dim=-1, keepdim=True)
-        return embedding.cpu().numpy().flatten().tolist()
+    def _preprocess_images(self, images: list[Image.Image]) -> torch.Tensor:
+        return torch.stack([self.preprocess(image) for image in images]).to(self.device)
+
+    def _forward_images(self, inputs: torch.Tensor) -> torch.Tensor:
+        return self.model.encode_image(inputs)
 
-    def encode_text(self, text: str) -> list[float]:
+    def _tokenize(self, texts: list[str]) -> torch.Tensor:
         import clip
 
-        text_input = clip.tokenize([text], truncate=True).to(self.device)
-        with torch.no_grad():
-            embedding = self.model.encode_text(text_input)
-            embedding = embedding / embedding.norm(dim=-1, keepdim=True)
-        return embedding.cpu().numpy().flatten().tolist()
+        return clip.tokenize(texts, truncate=True).to(self.device)
+
+    def _forward_text(self, inputs: torch.Tensor) -> torch.Tensor:
+        return self.model.encode_text(inputs)
 
     def unload(self) -> None:
         self.model = None
@@ -80,6 +129,7 @@ class OpenCLIPLoader(ModelLoader):
     def load(self, config: CLIPModelConfig, device: str) -> None:
         import open_clip
 
+        self.model_id = config.id
         self.device = device
         self.model, _, self.preprocess = open_clip.create_model_and_transforms(
             config.model_name,
@@ -90,19 +140,17 @@ class OpenCLIPLoader(ModelLoader):
         self.model = self.model.to(device)
         self.model.eval()
 
-    def encode_image(self, image: Image.Image) -> list[float]:
-        image_input = self.preprocess(image).unsqueeze(0).to(self.device)
-        with torch.no_grad():
-            embedding = self.model.encode_image(image_input)
-            embedding = embedding / embedding.norm(dim=-1, keepdim=True)
-        return embedding.cpu().numpy().flatten().tolist()
+    def _preprocess_images(self, images: list[Image.Image]) -> torch.Tensor:
+        return torch.stack([self.preprocess(image) for image in images]).to(self.device)
 
-    def encode_text(self, text: str) -> list[float]:
-        text_input = self.tokenizer([text]).to(self.device)
-        with torch.no_grad():
-            embedding = self.model.encode_text(text_input)
-            embedding = embedding / embedding.norm(dim=-1, keepdim=True)
-        return embedding.cpu().numpy().flatten().tolist()
+    def _forward_images(self, inputs: torch.Tensor) -> torch.Tensor:
+        return self.model.encode_image(inputs)
+
+    def _tokenize(self, texts: list[str]) -> torch.Tensor:
+        return self.tokenizer(texts).to(self.device)
+
+    def _forward_text(self, inputs: torch.Tensor) -> torch.Tensor:
+        return self.model.encode_text(inputs)
 
     def unload(self) -> None:
         self.model = None
@@ -119,6 +167,7 @@ class SigLIPLoader(ModelLoader):
     def load(self, config: CLIPModelConfig, device: str) -> None:
         from transformers import AutoProcessor, AutoModel
 
+        self.model_id = config.id
         self.device = device
         self.processor = AutoProcessor.from_pretrained(
             config.model_name,
@@ -130,21 +179,19 @@ class SigLIPLoader(ModelLoader):
         ).to(device)
         self.model.eval()
 
-    def encode_image(self, image: Image.Image) -> list[float]:
-        inputs = self.processor(images=image, return_tensors="pt").to(self.device)
-        with torch.no_grad():
-            embedding = self.model.get_image_features(**inputs)
-            embedding = embedding / embedding.norm(dim=-1, keepdim=True)
-        return embedding.cpu().numpy().flatten().tolist()
+    def _preprocess_images(self, images: list[Image.Image]):
+        return self.processor(images=images, return_tensors="pt").to(self.device)
+
+    def _forward_images(self, inputs) -> torch.Tensor:
+        return self.model.get_image_features(**inputs)
 
-    def encode_text(self, text: str) -> list[float]:
-        inputs = self.processor(
-            text=[text], return_tensors="pt", padding=True, truncation=True
+    def _tokenize(self, texts: list[str]):
+        return self.processor(
+            text=texts, return_tensors="pt", padding=True, truncation=True
         ).to(self.device)
-        with torch.no_grad():
-            embedding = self.model.get_text_features(**inputs)
-            embedding = embedding / embedding.norm(dim=-1, keepdim=True)
-        return embedding.cpu().numpy().flatten().tolist()
+
+    def _forward_text(self, inputs) -> torch.Tensor:
+        return self.model.get_text_features(**inputs)
 
     def unload(self) -> None:
         self.model = None
@@ -152,13 +199,17 @@ class SigLIPLoader(ModelLoader):
 
 
 class MultiModelCLIPService:
-    def __init__(self):
+    def __init__(self, loader_class: Optional[type[ModelLoader]] = None, device: Optional[str] = None):
         self._loaded_models: OrderedDict[str, ModelLoader] = OrderedDict()
-        self._device = "cuda" if torch.cuda.is_available() else "cpu"
+        self._device = device or ("cuda" if torch.cuda.is_available() else "cpu")
         self._lock = threading.Lock()
         self._current_model_id: str = settings.default_clip_model
+        # Overrides the per-family loader, e.g. with a stub for offline benchmarks.
+        self._loader_class = loader_class
 
     def _get_loader_class(self, family: ModelFamily) -> type[ModelLoader]:
+        if self._loader_class is not None:
+            return self._loader_class
         loaders = {
             ModelFamily.OPENAI_CLIP: OpenAICLIPLoader,
             ModelFamily.OPENCLIP: OpenCLIPLoader,
@@ -210,16 +261,28 @@ class MultiModelCLIPService:
         return self._current_model_id
 
     def get_image_embedding(
-        self, image_path: Path, model_id: Optional[str] = None
-    ) -> list[float]:
+        self, image_source: ImageSource, model_id: Optional[str] = None
+    ) -> np.ndarray:
         model_id = model_id or self._current_model_id
         loader = self.load_model(model_id)
-        image = Image.open(image_path).convert("RGB")
+        min_side = MODEL_REGISTRY[model_id].image_size
+        with stage_timer("decode", model_id):
+            image = open_image(image_source, min_side=min_side)
         return loader.encode_image(image)
 
+    def get_image_embeddings(
+        self, image_sources: list[ImageSource], model_id: Optional[str] = None
+    ) -> np.ndarray:
+        model_id = model_id or self._current_model_id
+        loader = self.load_model(model_id)
+        min_side = MODEL_REGISTRY[model_id].image_size
+        with stage_timer("decode", model_id):
+            images = [open_image(source, min_side=min_side) for source in image_sources]
+        return loader.encode_images(images)
+
     def get_text_embedding(
         self, text: str, model_id: Optional[str] = None
-    ) -> list[float]:
+    ) -> np.ndarray:
         model_id = model_id or self._current_model_id
         loader = self.load_model(model_id)
         return loader.encode_text(text)
@@ -230,5 +293,21 @@ class MultiModelCLIPService:
     def get_loaded_models(self) -> list[str]:
         return list(self._loaded_models.keys())
 
+    def memory_usage(self) -> dict[str, int]:
+        """Parameter bytes held by each loaded model."""
+        return {
+            model_id: loader.memory_bytes()
+            for model_id, loader in list(self._loaded_models.items())
+        }
+
+
+if settings.model_server_socket:
+    # Multi-worker mode: models live in one shared process (scripts/model_server.py).
+    from app.services.model_server import RemoteCLIPService
 
-clip_service = MultiModelCLIPService()
+    clip_service = RemoteCLIPService(settings.model_server_socket)
+else:
+    clip_service = MultiModelCLIPService()
+MODEL_MEMORY_BYTES.set_function(
+    lambda: {(model_id,): size for model_id, size in clip_service.memory_usage().items()}
+)
@@ -1,15 +1,205 @@
 import face_recognition
 import numpy as np
+import asyncio
+import hashlib
+import multiprocessing
+import os
+import threading
+from collections import OrderedDict
+import uuid
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
+from typing import Optional
 from fastapi import UploadFile
 from app.config import settings
+from app.services.vector_store import vector_store
+from app.utils.images import ImageSource, load_image_array
+from app.utils.metrics import stage_timer, record_cache, capture
+from PIL import Image
 import pickle
 
 
+def locate_faces(
+    image: np.ndarray,
+    model: Optional[str] = None,
+    upsample: Optional[int] = None,
+    max_side: Optional[int] = None,
+) -> list[tuple[int, int, int, int]]:
+    """Detect faces, downscaling large images first.
+
+    Detection runs on a copy whose longest side is at most ``max_side``; the
+    returned (top, right, bottom, left) boxes are mapped back to the original
+    resolution so encodings can still be computed on the full image.
+    """
+    model = model or settings.face_detection_model
+    upsample = settings.face_detection_upsample if upsample is None else upsample
+    max_side = settings.face_detection_max_side if max_side is None else max_side
+
+    height, width = image.shape[:2]
+    longest = max(height, width)
+    if not max_side or longest <= max_side:
+        with stage_timer("face_detect", model):
+            return face_recognition.face_locations(
+                image, number_of_times_to_upsample=upsample, model=model
+            )
+
+    scale = max_side / longest
+    small_size = (max(1, round(width * scale)), max(1, round(height * scale)))
+    small = np.asarray(Image.fromarray(image).resize(small_size, Image.BILINEAR))
+    with stage_timer("face_detect", model):
+        small_locations = face_recognition.face_locations(
+            small, number_of_times_to_upsample=upsample, model=model
+        )
+
+    locations = []
+    for top, right, bottom, left in small_locations:
+        locations.append((
+            max(0, int(round(top / scale))),
+            min(width, int(round(right / scale))),
+            min(height, int(round(bottom / scale))),
+            max(0, int(round(left / scale))),
+        ))
+    return locations
+
+
+def load_face_image(content: bytes) -> tuple[np.ndarray, float]:
+    """Decode an upright image no larger than detection needs, plus its scale.
+
+    JPEGs are decoded at a reduced size whose longest side stays at or above
+    the detection max side, so detection itself sees the same pixels as before.
+    Only detection uses this image; encodings are computed on the original.
+    """
+    with stage_timer("face_decode"):
+        return load_image_array(content, max_side=settings.face_detection_max_side)
+
+
+def detect_faces(content: bytes) -> tuple[np.ndarray, list[tuple]]:
+    """Detect faces and return the image to encode from with the face boxes.
+
+    Detection runs on the reduced decode. When it found faces in a reduced
+    image, the original is decoded in full and the boxes are mapped onto it,
+    so encodings see the same pixels as a full-resolution pipeline.
+    """
+    image, scale = load_face_image(content)
+    face_locations = locate_faces(image)
+    if scale != 1 and face_locations:
+        face_locations = [
+            tuple(int(round(v / scale)) for v in location) for location in face_locations
+        ]
+        with stage_timer("face_decode"):
+            image, _ = load_image_array(content)
+    return image, face_locations
+
+
+def detect_and_encode(content: bytes) -> tuple[list[tuple], list[np.ndarray]]:
+    """Detect faces in raw image bytes and return their locations and encodings.
+
+    Locations are in the coordinates of the full-size (EXIF-rotated) image.
+    Module-level so it can be pickled and run inside the face worker pool.
+    """
+    image, face_locations = detect_faces(content)
+    with stage_timer("face_encode"):
+        face_encodings = face_recognition.face_encodings(image, face_locations)
+    return face_locations, face_encodings
+
+
+def detect_and_encode_with_metrics(content: bytes) -> tuple[tuple[list, list], list]:
+    """Pool entry point: ``detect_and_encode`` plus its stage timings.
+
+    Timings recorded in a worker process would stay in that process; pass the
+    returned samples to ``metrics.replay`` in the parent.
+    """
+    with capture() as samples:
+        entry = detect_and_encode(content)
+    return entry, samples
+
+
+def build_face_points(
+    filename: str,
+    path: str,
+    face_locations: list[tuple],
+    face_encodings: list[np.ndarray],
+) -> list[dict]:
+    """Turn detected faces of one gallery image into face-collection points.
+
+    Point ids are derived from the filename and face index, so re-indexing an
+    image overwrites its faces instead of duplicating them.
+    """
+    points = []
+    for face_index, (location, encoding) in enumerate(zip(face_locations, face_encodings)):
+        top, right, bottom, left = (int(v) for v in location)
+        points.append({
+            "id": str(uuid.uuid5(uuid.NAMESPACE_URL, f"face:{filename}:{face_index}")),
+            "vector": encoding,
+            "payload": {
+                "filename": filename,
+                "path": path,
+                "face_index": face_index,
+                "box": {"top": top, "right": right, "bottom": bottom, "left": left},
+            },
+        })
+    return points
+
+
+def pairwise_distances(matrix: np.ndarray) -> np.ndarray:
+    """Euclidean distance matrix without materialising an n x n x d tensor."""
+    squared = np.einsum("ij,ij->i", matrix, matrix)
+    d2 = squared[:, None] + squared[None, :] - 2 * matrix @ matrix.T
+    return np.sqrt(np.maximum(d2, 0))
+
+
+def select_prototypes(
+    encodings: list[np.ndarray],
+    max_prototypes: int,
+    merge_distance: float,
+) -> list[int]:
+    """Pick indices of a bounded, representative subset of face encodings.
+
+    Encodings are grouped by leader clustering at ``merge_distance``; each
+    cluster contributes its medoid, plus any member farther than
+    ``merge_distance`` from that medoid so cluster edges stay covered.
+    Prototypes from the largest clusters are kept first when the result has to
+    be truncated to ``max_prototypes``.
+    """
+    if not encodings:
+        return []
+
+    distances = pairwise_distances(np.asarray(encodings))
+
+    clusters: list[list[int]] = []
+    leaders: list[int] = []
+    for i in range(len(encodings)):
+        if leaders:
+            leader_distances = distances[i, leaders]
+            nearest = int(np.argmin(leader_distances))
+            if leader_distances[nearest] <= merge_distance:
+                clusters[nearest].append(i)
+                continue
+        leaders.append(i)
+        clusters.append([i])
+
+    clusters.sort(key=len, reverse=True)
+    medoids: list[int] = []
+    outliers: list[int] = []
+    for members in clusters:
+        within = distances[np.ix_(members, members)]
+        medoid = members[int(np.argmin(within.sum(axis=1)))]
+        medoids.append(medoid)
+        outliers.extend(m for m in members if distances[medoid, m] > merge_distance)
+
+    return (medoids + outliers)[:max_prototypes]
+
+
 class FaceService:
     def __init__(self):
         self._reference_encodings: list[np.ndarray] = []
         self._encodings_file = settings.reference_dir / "encodings.pkl"
+        self._reference_matrix: Optional[np.ndarray] = None
+        self._pool: Optional[ProcessPoolExecutor] = None
+        # content hash -> (face_locations, face_encodings); threshold and
+        # reference independent, so entries stay valid as references change.
+        self._detection_cache: OrderedDict[str, tuple[list, list]] = OrderedDict()
+        self._cache_lock = threading.Lock()
         self._load_encodings()
 
     def _load_encodings(self):
@@ -17,6 +207,7 @@ class FaceService:
         if self._encodings_file.exists():
             with open(self._encodings_file, "rb") as f:
                 self._reference_encodings = pickle.load(f)
+        self._reference_matrix = None
 
     def _save_encodings(self):
         """Save reference encodings to disk."""
@@ -24,49 +215,130 @@ class FaceService:
         with open(self._encodings_file, "wb") as f:
             pickle.dump(self._reference_encodings, f)
 
+    def _next_reference_path(self) -> Path:
+        """Pick an unused ref_N.jpg name; compaction means N can't be the reference count.
+
+        Archived images count as taken, so N keeps increasing with insertion order.
+        """
+        taken = [
+            int(p.stem[4:]) for p in settings.reference_dir.rglob("ref_*.jpg")
+            if p.stem[4:].isdigit()
+        ]
+        return settings.reference_dir / f"ref_{max(taken, default=0) + 1}.jpg"
+
+    def _references(self) -> np.ndarray:
+        """Reference encodings stacked into one matrix, rebuilt after changes."""
+        if self._reference_matrix is None:
+            self._reference_matrix = np.asarray(self._reference_encodings)
+        return self._reference_matrix
+
+    @staticmethod
+    def content_key(content: bytes) -> str:
+        return hashlib.sha256(content).hexdigest()
+
+    def cache_get(self, key: str) -> Optional[tuple[list, list]]:
+        with self._cache_lock:
+            entry = self._detection_cache.get(key)
+            if entry is not None:
+                self._detection_cache.move_to_end(key)
+        record_cache("face_detection", entry is not None)
+        return entry
+
+    def cache_put(self, key: str, entry: tuple[list, list]) -> None:
+        if settings.face_cache_size <= 0:
+            return
+        with self._cache_lock:
+            self._detection_cache[key] = entry
+            self._detection_cache.move_to_end(key)
+            while len(self._detection_cache) > settings.face_cache_size:
+                self._detection_cache.popitem(last=False)
+
+    def detect_cached(self, content: bytes) -> tuple[list, list]:
+        """Detect and encode faces, reusing results for previously seen content."""
+        key = self.content_key(content)
+        entry = self.cache_get(key)
+        if entry is None:
+            entry = detect_and_encode(content)
+            self.cache_put(key, entry)
+        return entry
+
+    def reference_count(self) -> int:
+        return len(self._reference_encodings)
+
+    def get_pool(self) -> ProcessPoolExecutor:
+        """Return the shared process pool used for face detection and encoding."""
+        # A worker that died (segfault, OOM on a bad image) breaks the whole
+        # executor; start a fresh one instead of failing every later job.
+        if self._pool is not None and getattr(self._pool, "_broken", False):
+            self.discard_pool(self._pool)
+        if self._pool is None:
+            workers = settings.face_workers or os.cpu_count() or 1
+            # Never fork the multithreaded API process: a child could inherit
+            # a lock (e.g. a metrics lock) held by another thread and hang.
+            self._pool = ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context("forkserver")
+            )
+        return self._pool
+
+    def discard_pool(self, pool: ProcessPoolExecutor) -> None:
+        """Drop ``pool`` if it is still the shared one; the next get_pool() rebuilds it."""
+        if self._pool is pool:
+            self._pool = None
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def pool_backlog(self) -> int:
+        """Jobs submitted to the face pool that have not been picked up yet."""
+        if self._pool is None:
+            return 0
+        return len(getattr(self._pool, "_pending_work_items", {}))
+
+    def shutdown(self) -> None:
+        """Stop the face worker pool, if one was started."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
     async def add_reference(self, file: UploadFile) -> dict:
         """Add a reference image of Jo Yuri."""
-        import tempfile
+        content = await file.read()
 
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".jpg") as tmp:
-            content = await file.read()
-            tmp.write(content)
-            tmp_path = Path(tmp.name)
+        image, face_locations = detect_faces(content)
+        encodings = face_recognition.face_encodings(image, face_locations)
 
-        try:
-            image = face_recognition.load_image_file(tmp_path)
-            encodings = face_recognition.face_encodings(image)
+        if not encodings:
+            return {"success": False, "message": "No face detected in image"}
 
-            if not encodings:
-                return {"success": False, "message": "No face detected in image"}
+        self._reference_encodings.append(encodings[0])
+        self._reference_matrix = None
+        await asyncio.to_thread(self._persist_reference, content)
 
-            self._reference_encodings.append(encodings[0])
-            self._save_encodings()
+        return {
+            "success": True,
+            "message": f"Reference added. Total references: {len(self._reference_encodings)}",
+        }
 
-            settings.reference_dir.mkdir(parents=True, exist_ok=True)
-            ref_path = settings.reference_dir / f"ref_{len(self._reference_encodings)}.jpg"
-            ref_path.write_bytes(content)
+    def _persist_reference(self, content: bytes) -> None:
+        self._save_encodings()
+        settings.reference_dir.mkdir(parents=True, exist_ok=True)
+        self._next_reference_path().write_bytes(content)
 
-            return {
-                "success": True,
-                "message": f"Reference added. Total references: {len(self._reference_encodings)}",
-            }
-        finally:
-            tmp_path.unlink()
+    def verify(self, image: ImageSource, threshold: float = 0.6) -> dict:
+        """Verify if image contains Jo Yuri.
 
-    def verify(self, image_path: Path, threshold: float = 0.6) -> dict:
-        """Verify if image contains Jo Yuri."""
+        ``image`` may be a path or the raw bytes of an upload.
+        """
         if not self._reference_encodings:
-            return {
-                "is_joyuri": False,
-                "confidence": 0.0,
-                "faces_detected": 0,
-                "message": "No reference images loaded. Add reference images first.",
-            }
+            return self._no_references_result()
 
-        image = face_recognition.load_image_file(image_path)
-        face_locations = face_recognition.face_locations(image)
-        face_encodings = face_recognition.face_encodings(image, face_locations)
+        content = image if isinstance(image, bytes) else Path(image).read_bytes()
+        _, face_encodings = self.detect_cached(content)
+
+        return self.match_encodings(face_encodings, threshold=threshold)
+
+    def match_encodings(self, face_encodings: list[np.ndarray], threshold: float = 0.6) -> dict:
+        """Compare already-computed face encodings against the reference set."""
+        if not self._reference_encodings:
+            return self._no_references_result()
 
         if not face_encodings:
             return {
@@ -76,28 +348,154 @@ class FaceService:
                 "message": "No faces detected in image",
             }
 
-        best_confidence = 0.0
-        is_joyuri = False
-
-        for encoding in face_encodings:
-            distances = face_recognition.face_distance(
-                self._reference_encodings, encoding
-            )
-            min_distance = min(distances)
-            confidence = 1 - min_distance
+        references = self._references()
+        faces = np.asarray(face_encodings)
+        with stage_timer("face_match"):
+            distances = np.linalg.norm(faces[:, None, :] - references[None, :, :], axis=-1)
+            min_distance = float(distances.min())
 
-            if confidence > best_confidence:
-                best_confidence = confidence
-
-            if min_distance <= threshold:
-                is_joyuri = True
+        best_confidence = 1 - min_distance
+        is_joyuri = min_distance <= threshold
 
         return {
             "is_joyuri": is_joyuri,
-            "confidence": round(best_confidence, 4),
+            "confidence": round(float(best_confidence), 4),
             "faces_detected": len(face_encodings),
             "message": "Match found!" if is_joyuri else "No match found",
         }
 
+    def search_gallery(self, threshold: float = 0.6, limit: int = 50) -> list[dict]:
+        """Find indexed gallery images containing a face close to any reference."""
+        if not self._reference_encodings:
+            return []
+
+        hits_per_reference = vector_store.search_faces(
+            self._reference_encodings,
+            limit=limit,
+            max_distance=threshold,
+        )
+
+        best_by_image: dict[str, dict] = {}
+        for hits in hits_per_reference:
+            for hit in hits:
+                filename = hit["payload"].get("filename", "")
+                current = best_by_image.get(filename)
+                if current is None or hit["score"] < current["score"]:
+                    best_by_image[filename] = hit
+
+        matches = sorted(best_by_image.values(), key=lambda h: h["score"])[:limit]
+        return [
+            {
+                "filename": hit["payload"].get("filename", ""),
+                "distance": round(hit["score"], 4),
+                "confidence": round(1 - hit["score"], 4),
+                "box": hit["payload"].get("box"),
+            }
+            for hit in matches
+        ]
+
+    def compact_references(
+        self,
+        max_prototypes: Optional[int] = None,
+        merge_distance: Optional[float] = None,
+        threshold: float = 0.6,
+        dry_run: bool = False,
+    ) -> dict:
+        """Replace the reference set with a bounded set of prototypes.
+
+        The report compares leave-one-out verification decisions for every
+        stored reference before and after compaction. The ``ref_N.jpg`` images
+        of dropped references are moved to ``archived/`` so the remaining ones
+        still line up with ``encodings.pkl``; if they already did not (e.g.
+        files were added by hand), the images are left alone.
+        """
+        max_prototypes = max_prototypes or settings.face_reference_max_prototypes
+        if merge_distance is None:
+            merge_distance = settings.face_reference_merge_distance
+
+        encodings = list(self._reference_encodings)
+        keep = select_prototypes(encodings, max_prototypes, merge_distance)
+        report = self._compaction_report(encodings, keep, threshold)
+        report.update({
+            "references_before": len(encodings),
+            "references_after": len(keep),
+            "max_prototypes": max_prototypes,
+            "merge_distance": merge_distance,
+            "applied": not dry_run,
+            "images_archived": 0,
+        })
+
+        if not dry_run and len(keep) < len(encodings):
+            self._reference_encodings = [encodings[i] for i in sorted(keep)]
+            self._reference_matrix = None
+            self._save_encodings()
+            report["images_archived"] = self._archive_reference_images(len(encodings), keep)
+
+        return report
+
+    def _reference_images(self) -> list[Path]:
+        """Stored ref_N.jpg files in the order their encodings were added."""
+        numbered = [
+            (int(p.stem[4:]), p) for p in settings.reference_dir.glob("ref_*.jpg")
+            if p.stem[4:].isdigit()
+        ]
+        return [p for _, p in sorted(numbered)]
+
+    def _archive_reference_images(self, count: int, keep: list[int]) -> int:
+        images = self._reference_images()
+        if len(images) != count:
+            return 0
+        archive_dir = settings.reference_dir / "archived"
+        archive_dir.mkdir(parents=True, exist_ok=True)
+        kept = set(keep)
+        dropped = [p for i, p in enumerate(images) if i not in kept]
+        for path in dropped:
+            path.replace(archive_dir / path.name)
+        return len(dropped)
+
+    def _compaction_report(
+        self, encodings: list[np.ndarray], keep: list[int], threshold: float
+    ) -> dict:
+        if len(encodings) < 2:
+            return {"evaluated": 0, "agreement": 1.0, "flipped": []}
+
+        distances = pairwise_distances(np.asarray(encodings))
+        np.fill_diagonal(distances, np.inf)
+
+        before = distances.min(axis=1)
+        after = distances[:, keep].min(axis=1)
+
+        def _round(value: float) -> Optional[float]:
+            return round(float(value), 4) if np.isfinite(value) else None
+
+        def _mean(values: np.ndarray) -> Optional[float]:
+            finite = values[np.isfinite(values)]
+            return _round(finite.mean()) if finite.size else None
+
+        flipped = [
+            {
+                "reference": i,
+                "distance_before": _round(before[i]),
+                "distance_after": _round(after[i]),
+            }
+            for i in range(len(encodings))
+            if (before[i] <= threshold) != (after[i] <= threshold)
+        ]
+        return {
+            "evaluated": len(encodings),
+            "agreement": round(1 - len(flipped) / len(encodings), 4),
+            "mean_distance_before": _mean(before),
+            "mean_distance_after": _mean(after),
+            "flipped": flipped,
+        }
+
+    def _no_references_result(self) -> dict:
+        return {
+            "is_joyuri": False,
+            "confidence": 0.0,
+            "faces_detected": 0,
+            "message": "No reference images loaded. Add reference images first.",
+        }
+
 
 face_service = FaceService()
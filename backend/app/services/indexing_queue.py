@@ -0,0 +1,156 @@
+import asyncio
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Optional
+
+import numpy as np
+
+from app.config import settings
+from app.services.clip_service import clip_service
+from app.services.vector_store import vector_store
+from app.services.thumbnail_service import thumbnail_service
+from app.services.phash_index import phash_index
+
+
+@dataclass
+class IndexJob:
+    image_id: str
+    model_id: str
+    path: Path
+    payload: dict = field(default_factory=dict)
+    done: Optional[asyncio.Future] = None  # resolved with the final status dict
+
+
+class IndexingQueue:
+    """Background worker that embeds and upserts uploaded images in batches."""
+
+    def __init__(self, maxsize: Optional[int] = None):
+        self._maxsize = maxsize
+        self._queue: Optional[asyncio.Queue[IndexJob]] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._status: OrderedDict[str, dict] = OrderedDict()
+        # Called (in the worker thread) with each successfully indexed batch.
+        self._listeners: list[Callable[[str, list[IndexJob]], None]] = []
+
+    def add_listener(self, listener: Callable[[str, list[IndexJob]], None]) -> None:
+        self._listeners.append(listener)
+
+    def start(self) -> None:
+        if self._worker is None:
+            maxsize = self._maxsize if self._maxsize is not None else settings.indexing_queue_size
+            self._queue = asyncio.Queue(maxsize=maxsize)
+            self._worker = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+
+    async def submit(self, job: IndexJob) -> None:
+        """Queue a job; waits when the queue is full so uploads apply backpressure."""
+        self.start()
+        self._set_status(job.image_id, "pending")
+        await self._queue.put(job)
+
+    async def join(self) -> None:
+        """Wait until every submitted job has been indexed or has failed."""
+        if self._queue is not None:
+            await self._queue.join()
+
+    def get_status(self, image_id: str) -> Optional[dict]:
+        return self._status.get(image_id)
+
+    def depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def _set_status(self, image_id: str, status: str, error: Optional[str] = None) -> None:
+        self._status[image_id] = {"id": image_id, "status": status, "error": error}
+        self._status.move_to_end(image_id)
+        while len(self._status) > settings.indexing_status_history:
+            self._status.popitem(last=False)
+
+    async def _next_batch(self) -> list[IndexJob]:
+        batch = [await self._queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + settings.indexing_batch_wait
+        while len(batch) < settings.indexing_batch_size:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._next_batch()
+            by_model: dict[str, list[IndexJob]] = {}
+            for job in batch:
+                by_model.setdefault(job.model_id, []).append(job)
+
+            for model_id, jobs in by_model.items():
+                try:
+                    errors = await loop.run_in_executor(None, self._index_jobs, model_id, jobs)
+                except Exception as e:
+                    errors = {job.image_id: str(e) for job in jobs}
+                for job in jobs:
+                    if job.image_id in errors:
+                        self._set_status(job.image_id, "failed", errors[job.image_id])
+                        # Let the image be uploaded again after a fix.
+                        try:
+                            await loop.run_in_executor(None, phash_index.remove, job.path.name)
+                        except Exception:
+                            pass
+                    else:
+                        self._set_status(job.image_id, "indexed")
+                    if job.done is not None and not job.done.done():
+                        job.done.set_result(self._status[job.image_id])
+
+            for _ in batch:
+                self._queue.task_done()
+
+    def _index_jobs(self, model_id: str, jobs: list[IndexJob]) -> dict[str, str]:
+        """Embed and upsert a batch; returns errors keyed by image id."""
+        try:
+            embeddings = clip_service.get_image_embeddings([job.path for job in jobs], model_id)
+            indexed_jobs, errors = jobs, {}
+        except Exception:
+            if len(jobs) == 1:
+                raise
+            # One bad file shouldn't fail the whole batch: retry one by one.
+            indexed_jobs, rows, errors = [], [], {}
+            for job in jobs:
+                try:
+                    rows.append(clip_service.get_image_embedding(job.path, model_id))
+                    indexed_jobs.append(job)
+                except Exception as e:
+                    errors[job.image_id] = str(e)
+            if not rows:
+                return errors
+            embeddings = np.stack(rows)
+
+        vector_store.upsert_arrays(
+            model_id,
+            [job.image_id for job in indexed_jobs],
+            embeddings,
+            [job.payload for job in indexed_jobs],
+        )
+        for listener in self._listeners:
+            listener(model_id, indexed_jobs)
+        for job in indexed_jobs:
+            try:
+                thumbnail_service.generate_defaults(job.path)
+            except Exception:
+                pass
+        return errors
+
+
+indexing_queue = IndexingQueue()
@@ -0,0 +1,113 @@
+import hashlib
+import tarfile
+import uuid
+import zipfile
+from pathlib import PurePosixPath
+from typing import BinaryIO, Iterator, Optional
+
+from app.config import settings
+from app.services.phash_index import phash_index
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp", ".gif"}
+ZIP_TYPES = {"application/zip", "application/x-zip-compressed"}
+TAR_TYPES = {"application/x-tar", "application/gzip", "application/x-gzip", "application/x-gtar"}
+TAR_SUFFIXES = (".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tar.xz")
+
+
+def archive_kind(filename: str, content_type: Optional[str]) -> Optional[str]:
+    name = (filename or "").lower()
+    if content_type in ZIP_TYPES or name.endswith(".zip"):
+        return "zip"
+    if content_type in TAR_TYPES or name.endswith(TAR_SUFFIXES):
+        return "tar"
+    return None
+
+
+def _save_stream(stream: BinaryIO, name: str) -> dict:
+    """Copy a stream into the images directory in chunks.
+
+    Near-duplicates of already-ingested images are removed again and reported
+    via ``duplicate_of`` instead of being indexed twice.
+    """
+    image_id = str(uuid.uuid4())
+    path = settings.images_dir / f"{image_id}_{PurePosixPath(name).name}"
+    digest = hashlib.sha256()
+    try:
+        with open(path, "wb") as out:
+            while chunk := stream.read(settings.upload_chunk_size):
+                digest.update(chunk)
+                out.write(chunk)
+    except BaseException:
+        # Don't leave a truncated file for index_images.py to pick up.
+        path.unlink(missing_ok=True)
+        raise
+    sha256 = digest.hexdigest()
+
+    try:
+        duplicate = phash_index.check_and_add(path, path.name)
+    except Exception:
+        duplicate = None  # undecodable here; let the indexer report it
+    if duplicate is not None:
+        path.unlink(missing_ok=True)
+        return {"name": name, "id": None, "path": None, "error": None,
+                "duplicate_of": duplicate, "sha256": sha256}
+    return {"name": name, "id": image_id, "path": path, "error": None,
+            "duplicate_of": None, "sha256": sha256}
+
+
+def _save_member(stream: BinaryIO, name: str) -> dict:
+    """``_save_stream``, reporting failures in the result instead of raising."""
+    try:
+        return _save_stream(stream, name)
+    except Exception as e:
+        return {"name": name, "id": None, "path": None, "error": str(e)}
+
+
+def _iter_zip(fileobj: BinaryIO) -> Iterator[tuple[str, BinaryIO]]:
+    with zipfile.ZipFile(fileobj) as archive:
+        for info in archive.infolist():
+            if not info.is_dir():
+                with archive.open(info) as member:
+                    yield info.filename, member
+
+
+def _iter_tar(fileobj: BinaryIO) -> Iterator[tuple[str, BinaryIO]]:
+    # "r|*" reads the archive as a forward-only stream, no seeking or temp copy.
+    with tarfile.open(fileobj=fileobj, mode="r|*") as archive:
+        for member in archive:
+            if member.isfile():
+                stream = archive.extractfile(member)
+                if stream is not None:
+                    yield member.name, stream
+
+
+def extract_upload(
+    fileobj: BinaryIO, filename: str, content_type: Optional[str]
+) -> Iterator[dict]:
+    """Save one uploaded file, or every image inside an uploaded archive.
+
+    Yields one result per file with ``name``, ``id``, ``path``, ``error`` and,
+    for saved files, ``duplicate_of`` and ``sha256``.
+    """
+    settings.images_dir.mkdir(parents=True, exist_ok=True)
+    kind = archive_kind(filename, content_type)
+
+    if kind is None:
+        if not content_type or not content_type.startswith("image/"):
+            yield {"name": filename, "id": None, "path": None, "error": "File must be an image"}
+            return
+        yield _save_member(fileobj, filename)
+        return
+
+    members = _iter_zip(fileobj) if kind == "zip" else _iter_tar(fileobj)
+    try:
+        for count, (name, stream) in enumerate(members):
+            if count >= settings.bulk_max_files:
+                yield {"name": filename, "id": None, "path": None,
+                       "error": f"Archive exceeds {settings.bulk_max_files} files"}
+                return
+            if PurePosixPath(name).suffix.lower() not in IMAGE_EXTENSIONS:
+                continue
+            yield _save_member(stream, name)
+    except (zipfile.BadZipFile, tarfile.TarError) as e:
+        yield {"name": filename, "id": None, "path": None, "error": f"Invalid archive: {e}"}
@@ -0,0 +1,324 @@
+"""
+Zero-downtime switch of the current model.
+
+Qdrant collection aliases hold the shared state, so every API worker agrees
+on it without talking to the others:
+
+    <base>_current    collection of the model searched and written by default
+    <base>_next       migration target; writes to the current model are mirrored here
+    <base>_previous   old collection right after a switch; late writes still
+                      addressed to it are mirrored to the new current model
+
+A migration recreates the target collection empty, marks it as ``next``
+(dual-write on), backfills it from the image paths stored in the current
+collection, switches ``current`` in one atomic alias update, drains in-flight
+uploads and optionally drops the old collection. Workers poll the aliases
+every ``alias_refresh_interval`` seconds.
+"""
+
+import asyncio
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Optional
+
+from app.config import settings
+from app.models.clip_models import MODEL_REGISTRY
+from app.services.clip_service import clip_service
+from app.services.indexing_queue import IndexJob, indexing_queue
+from app.services.vector_store import async_vector_store, model_for_collection, vector_store
+
+CURRENT_ALIAS = f"{settings.qdrant_collection}_current"
+NEXT_ALIAS = f"{settings.qdrant_collection}_next"
+PREVIOUS_ALIAS = f"{settings.qdrant_collection}_previous"
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class MigrationService:
+    def __init__(self):
+        # source model id -> model id its writes are mirrored to
+        self._mirrors: dict[str, str] = {}
+        # image id -> (target model, path, payload) for mirror writes that failed
+        self._missed: dict[str, tuple[str, Path, dict]] = {}
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._refresher: Optional[asyncio.Task] = None
+        self._status: dict = {"status": "idle"}
+
+    # Shared alias state
+
+    def mirror_target(self, model_id: str) -> Optional[str]:
+        """Model that writes for ``model_id`` must also go to, if a migration is live."""
+        return self._mirrors.get(model_id)
+
+    def apply_aliases(self, aliases: dict[str, str]) -> None:
+        current = model_for_collection(aliases.get(CURRENT_ALIAS))
+        target = model_for_collection(aliases.get(NEXT_ALIAS))
+        previous = model_for_collection(aliases.get(PREVIOUS_ALIAS))
+
+        mirrors = {}
+        if current and target:
+            mirrors[current] = target
+        if previous and current:
+            mirrors[previous] = current
+        self._mirrors = mirrors
+
+        if current and current != clip_service.get_current_model_id():
+            clip_service.set_current_model(current)
+
+    async def refresh(self) -> None:
+        try:
+            aliases = await async_vector_store.get_aliases()
+        except Exception:
+            return
+        self.apply_aliases(aliases)
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            await asyncio.sleep(settings.alias_refresh_interval)
+            await self.refresh()
+
+    async def start_refresher(self) -> None:
+        await self.refresh()
+        if self._refresher is None:
+            self._refresher = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self) -> None:
+        for task in (self._refresher, self._task):
+            if task is not None and not task.done():
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._refresher = None
+
+    async def _check_idle(self) -> None:
+        """Raise if any worker has a migration in flight.
+
+        The ``next``/``previous`` aliases exist only while a migration runs, so
+        they serve as the lock shared by all workers.
+        """
+        if self.is_running():
+            raise RuntimeError("A migration is in progress")
+        aliases = await async_vector_store.get_aliases()
+        if NEXT_ALIAS in aliases or PREVIOUS_ALIAS in aliases:
+            raise RuntimeError("A migration is in progress")
+
+    async def set_current(self, model_id: str) -> None:
+        """Switch the current model directly (no backfill) and record it in the alias.
+
+        The alias is updated first: if that fails the error propagates and
+        nothing changes, instead of the refresher silently reverting the switch.
+        """
+        await self._check_idle()
+        if await async_vector_store.get_collection_info(model_id) is not None:
+            await asyncio.to_thread(vector_store.update_aliases, {CURRENT_ALIAS: model_id})
+        else:
+            await asyncio.to_thread(vector_store.update_aliases, remove=[CURRENT_ALIAS])
+        clip_service.set_current_model(model_id)
+
+    # Writes
+
+    def _index_into(
+        self, model_id: str, ids: list, paths: list[Path], payloads: list[dict]
+    ) -> dict:
+        """Embed ``paths`` with ``model_id`` and upsert under the given ids.
+
+        Falls back to one image at a time if the batch fails; returns errors
+        keyed by id.
+        """
+        if not ids:
+            return {}
+        try:
+            embeddings = clip_service.get_image_embeddings(paths, model_id)
+            vector_store.upsert_arrays(model_id, ids, embeddings, payloads)
+            return {}
+        except Exception:
+            if len(ids) == 1:
+                raise
+        errors = {}
+        for point_id, path, payload in zip(ids, paths, payloads):
+            try:
+                embedding = clip_service.get_image_embedding(path, model_id)
+                vector_store.upsert_arrays(model_id, [point_id], embedding[None, :], [payload])
+            except Exception as e:
+                errors[point_id] = str(e)
+        return errors
+
+    def mirror_batch(self, model_id: str, jobs: list[IndexJob]) -> None:
+        """Indexing-queue listener: dual-write a freshly indexed batch."""
+        target = self.mirror_target(model_id)
+        if target is None or not jobs:
+            return
+        try:
+            errors = self._index_into(
+                target,
+                [job.image_id for job in jobs],
+                [job.path for job in jobs],
+                [job.payload for job in jobs],
+            )
+        except Exception as e:
+            errors = {job.image_id: str(e) for job in jobs}
+        if errors:
+            with self._lock:
+                for job in jobs:
+                    if job.image_id in errors:
+                        self._missed[job.image_id] = (target, job.path, job.payload)
+
+    async def _catch_up(self, target: str) -> None:
+        """Retry mirror writes that failed, so the target is not missing uploads."""
+        with self._lock:
+            missed = {k: v for k, v in self._missed.items() if v[0] == target}
+            for key in missed:
+                del self._missed[key]
+        if not missed:
+            return
+        ids = list(missed)
+        errors = await asyncio.to_thread(
+            self._index_into,
+            target,
+            ids,
+            [missed[i][1] for i in ids],
+            [missed[i][2] for i in ids],
+        )
+        self._status["errors"] += len(errors)
+
+    # Migration workflow
+
+    def is_running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def get_status(self) -> dict:
+        with self._lock:
+            missed = len(self._missed)
+        return {**self._status, "pending_mirror_retries": missed, "mirrors": dict(self._mirrors)}
+
+    async def start(self, target: str, drop_old: bool = False) -> dict:
+        if target not in MODEL_REGISTRY:
+            raise ValueError(f"Unknown model: {target}")
+        await self._check_idle()
+        source = clip_service.get_current_model_id()
+        if target == source:
+            raise ValueError(f"{target} is already the current model")
+        if await async_vector_store.get_collection_info(source) is None:
+            raise ValueError(f"Current model {source} has no collection to migrate from")
+
+        self._status = {
+            "status": "starting",
+            "source": source,
+            "target": target,
+            "drop_old": drop_old,
+            "total": 0,
+            "done": 0,
+            "errors": 0,
+            "error": None,
+            "started_at": _now(),
+            "finished_at": None,
+        }
+        self._task = asyncio.create_task(self._migrate(source, target, drop_old))
+        return self.get_status()
+
+    async def cancel(self) -> None:
+        if self.is_running():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    def _set(self, status: str, **fields) -> None:
+        self._status.update(status=status, **fields)
+
+    async def _backfill(self, source: str, target: str) -> None:
+        self._set("backfilling", total=await asyncio.to_thread(vector_store.count, source))
+        points = vector_store.iter_points(
+            source, batch_size=settings.indexing_batch_size, with_vectors=False
+        )
+        while True:
+            batch = await asyncio.to_thread(next, points, None)
+            if batch is None:
+                return
+            ids, _, payloads = batch
+            rows = [(i, p) for i, p in zip(ids, payloads) if p.get("path")]
+            try:
+                errors = await asyncio.to_thread(
+                    self._index_into,
+                    target,
+                    [i for i, _ in rows],
+                    [Path(p["path"]) for _, p in rows],
+                    [p for _, p in rows],
+                )
+            except Exception as e:
+                errors = {i: str(e) for i, _ in rows}
+            self._status["done"] += len(ids)
+            self._status["errors"] += len(errors) + len(ids) - len(rows)
+
+    async def _migrate(self, source: str, target: str, drop_old: bool) -> None:
+        switched = False
+        try:
+            self._set("loading_model")
+            await asyncio.to_thread(clip_service.load_model, target)
+            # Start from an empty target: an earlier index run (random ids) or
+            # aborted migration would otherwise leave duplicates and deleted
+            # images behind after the switch.
+            await asyncio.to_thread(vector_store.delete_collection, target)
+            await asyncio.to_thread(vector_store.ensure_collection, target)
+
+            # Dual-write on. Give every worker a refresh interval to notice
+            # before scrolling, so no upload falls between scroll and mirror.
+            await asyncio.to_thread(
+                vector_store.update_aliases, {CURRENT_ALIAS: source, NEXT_ALIAS: target}
+            )
+            await self.refresh()
+            await asyncio.sleep(settings.alias_refresh_interval)
+
+            await self._backfill(source, target)
+            await self._catch_up(target)
+
+            self._set("switching")
+            await asyncio.to_thread(
+                vector_store.update_aliases,
+                {CURRENT_ALIAS: target, PREVIOUS_ALIAS: source},
+                [NEXT_ALIAS],
+            )
+            switched = True
+            await self.refresh()
+
+            # Uploads queued against the old model are still mirrored to the
+            # new one via the previous alias; wait for them before dropping it.
+            self._set("draining")
+            await indexing_queue.join()
+            await asyncio.sleep(settings.alias_refresh_interval)
+            await indexing_queue.join()
+            await self._catch_up(target)
+
+            await asyncio.to_thread(vector_store.update_aliases, remove=[PREVIOUS_ALIAS])
+            if drop_old:
+                await asyncio.to_thread(vector_store.delete_collection, source)
+            await self.refresh()
+            self._set("complete", finished_at=_now())
+        except asyncio.CancelledError:
+            await self._abort(switched)
+            self._set("cancelled", finished_at=_now())
+            raise
+        except Exception as e:
+            await self._abort(switched)
+            self._set("failed", error=str(e), finished_at=_now())
+
+    async def _abort(self, switched: bool) -> None:
+        """Stop dual-writing. After the switch the new model simply stays current."""
+        try:
+            await asyncio.to_thread(
+                vector_store.update_aliases, remove=[PREVIOUS_ALIAS if switched else NEXT_ALIAS]
+            )
+        except Exception:
+            pass
+        await self.refresh()
+
+
+migration_service = MigrationService()
+indexing_queue.add_listener(migration_service.mirror_batch)
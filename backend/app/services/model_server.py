@@ -0,0 +1,244 @@
+"""
+Shared model server for multi-worker deployments.
+
+One process owns the model loaders (``MultiModelCLIPService``); API workers
+talk to it over a Unix socket through ``RemoteCLIPService``, which mirrors the
+``clip_service`` API. Control messages are length-prefixed JSON; image bytes
+and embedding matrices travel through shared memory blocks created by the
+client, so large payloads are never copied through the socket.
+"""
+
+import json
+import os
+import socket
+import socketserver
+import struct
+import threading
+from multiprocessing import resource_tracker, shared_memory
+from pathlib import Path
+from typing import Callable, Optional
+
+import numpy as np
+
+from app.config import settings
+from app.models.clip_models import MODEL_REGISTRY
+from app.utils.images import ImageSource
+
+_HEADER = struct.Struct("!I")
+
+
+def _send(sock: socket.socket, message: dict) -> None:
+    data = json.dumps(message).encode()
+    sock.sendall(_HEADER.pack(len(data)) + data)
+
+
+def _recv_exact(sock: socket.socket, size: int) -> bytes:
+    chunks = []
+    while size:
+        chunk = sock.recv(size)
+        if not chunk:
+            raise ConnectionError("Model server connection closed")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+def _recv(sock: socket.socket) -> dict:
+    (size,) = _HEADER.unpack(_recv_exact(sock, _HEADER.size))
+    return json.loads(_recv_exact(sock, size))
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    """Attach to a client-owned block without letting this process's tracker unlink it."""
+    block = shared_memory.SharedMemory(name=name)
+    resource_tracker.unregister(block._name, "shared_memory")
+    return block
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self) -> None:
+        service = self.server.service
+        while True:
+            try:
+                request = _recv(self.request)
+            except (ConnectionError, struct.error):
+                return
+            try:
+                response = self.server.dispatch(service, request)
+                response["ok"] = True
+            except Exception as e:
+                response = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+            _send(self.request, response)
+
+
+class ModelServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path: str, service):
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        Path(socket_path).parent.mkdir(parents=True, exist_ok=True)
+        self.service = service
+        super().__init__(socket_path, _Handler)
+
+    def dispatch(self, service, request: dict) -> dict:
+        op = request["op"]
+        if op == "embed_images":
+            return self._embed_images(service, request)
+        if op == "embed_text":
+            embedding = service.get_text_embedding(request["text"], request["model_id"])
+            return {"embedding": np.asarray(embedding, dtype=np.float32).tolist()}
+        if op == "load_model":
+            service.load_model(request["model_id"])
+            return {}
+        if op == "set_current_model":
+            service.set_current_model(request["model_id"])
+            return {}
+        if op == "get_current_model_id":
+            return {"model_id": service.get_current_model_id()}
+        if op == "get_loaded_models":
+            return {"models": service.get_loaded_models()}
+        if op == "memory_usage":
+            return {"memory": service.memory_usage()}
+        raise ValueError(f"Unknown op: {op}")
+
+    def _embed_images(self, service, request: dict) -> dict:
+        sources: list[ImageSource] = []
+        input_block = _attach(request["input_shm"]) if request.get("input_shm") else None
+        try:
+            for item in request["images"]:
+                if "path" in item:
+                    sources.append(Path(item["path"]))
+                else:
+                    start, end = item["offset"], item["offset"] + item["size"]
+                    sources.append(bytes(input_block.buf[start:end]))
+        finally:
+            if input_block is not None:
+                input_block.close()
+
+        embeddings = np.asarray(
+            service.get_image_embeddings(sources, request["model_id"]), dtype=np.float32
+        )
+        output_block = _attach(request["output_shm"])
+        try:
+            out = np.ndarray(embeddings.shape, dtype=np.float32, buffer=output_block.buf)
+            out[:] = embeddings
+            del out
+        finally:
+            output_block.close()
+        return {"shape": list(embeddings.shape)}
+
+
+class RemoteCLIPService:
+    """Drop-in client for ``MultiModelCLIPService`` backed by a ``ModelServer``."""
+
+    def __init__(self, socket_path: str):
+        self._socket_path = socket_path
+        self._local = threading.local()
+
+    def _socket(self) -> socket.socket:
+        sock = getattr(self._local, "sock", None)
+        if sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.connect(self._socket_path)
+            self._local.sock = sock
+        return sock
+
+    def _call(self, message: dict) -> dict:
+        for attempt in range(2):
+            try:
+                sock = self._socket()
+                _send(sock, message)
+                response = _recv(sock)
+                break
+            except (ConnectionError, OSError):
+                # Server restarted or connection dropped: reconnect once.
+                self._local.sock = None
+                if attempt:
+                    raise
+        if not response.get("ok"):
+            raise RuntimeError(f"Model server error: {response.get('error')}")
+        return response
+
+    def _with_blocks(self, sizes: list[int], use: Callable[[list], dict]) -> dict:
+        blocks = [shared_memory.SharedMemory(create=True, size=max(size, 1)) for size in sizes]
+        try:
+            return use(blocks)
+        finally:
+            for block in blocks:
+                block.close()
+                block.unlink()
+
+    def load_model(self, model_id: str, progress_callback=None) -> None:
+        if model_id not in MODEL_REGISTRY:
+            raise ValueError(f"Unknown model: {model_id}")
+        if progress_callback:
+            progress_callback(10)
+        self._call({"op": "load_model", "model_id": model_id})
+        if progress_callback:
+            progress_callback(100)
+
+    def set_current_model(self, model_id: str) -> None:
+        if model_id not in MODEL_REGISTRY:
+            raise ValueError(f"Unknown model: {model_id}")
+        self._call({"op": "set_current_model", "model_id": model_id})
+
+    def get_current_model_id(self) -> str:
+        return self._call({"op": "get_current_model_id"})["model_id"]
+
+    def get_image_embedding(
+        self, image_source: ImageSource, model_id: Optional[str] = None
+    ) -> np.ndarray:
+        return self.get_image_embeddings([image_source], model_id)[0]
+
+    def get_image_embeddings(
+        self, image_sources: list[ImageSource], model_id: Optional[str] = None
+    ) -> np.ndarray:
+        model_id = model_id or self.get_current_model_id()
+        dim = MODEL_REGISTRY[model_id].vector_dim
+
+        images, payloads, offset = [], [], 0
+        for source in image_sources:
+            if isinstance(source, bytes):
+                images.append({"offset": offset, "size": len(source)})
+                payloads.append(source)
+                offset += len(source)
+            else:
+                images.append({"path": str(Path(source).resolve())})
+
+        def run(blocks) -> dict:
+            output_block = blocks[0]
+            message = {
+                "op": "embed_images",
+                "model_id": model_id,
+                "images": images,
+                "output_shm": output_block.name,
+            }
+            if payloads:
+                input_block = blocks[1]
+                position = 0
+                for payload in payloads:
+                    input_block.buf[position:position + len(payload)] = payload
+                    position += len(payload)
+                message["input_shm"] = input_block.name
+            shape = tuple(self._call(message)["shape"])
+            result = np.ndarray(shape, dtype=np.float32, buffer=output_block.buf)
+            return {"embeddings": result.astype(settings.embedding_dtype)}
+
+        sizes = [len(image_sources) * dim * 4] + ([offset] if payloads else [])
+        return self._with_blocks(sizes, run)["embeddings"]
+
+    def get_text_embedding(self, text: str, model_id: Optional[str] = None) -> np.ndarray:
+        model_id = model_id or self.get_current_model_id()
+        response = self._call({"op": "embed_text", "text": text, "model_id": model_id})
+        return np.asarray(response["embedding"], dtype=settings.embedding_dtype)
+
+    def is_model_loaded(self, model_id: str) -> bool:
+        return model_id in self.get_loaded_models()
+
+    def get_loaded_models(self) -> list[str]:
+        return self._call({"op": "get_loaded_models"})["models"]
+
+    def memory_usage(self) -> dict[str, int]:
+        return self._call({"op": "memory_usage"})["memory"]
+
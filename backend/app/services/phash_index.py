@@ -0,0 +1,163 @@
+import io
+import threading
+from pathlib import Path
+from typing import Optional
+
+from PIL import Image
+
+from app.config import settings
+from app.utils.images import ImageSource
+
+
+def dhash(source: ImageSource, hash_size: int = 8) -> int:
+    """64-bit difference hash: robust to rescaling, recompression and small crops."""
+    if isinstance(source, bytes):
+        source = io.BytesIO(source)
+    with Image.open(source) as image:
+        # JPEG draft decoding: we only need a tiny grayscale thumbnail.
+        image.draft("L", (hash_size * 16, hash_size * 16))
+        small = image.convert("L").resize((hash_size + 1, hash_size), Image.LANCZOS)
+        pixels = small.tobytes()
+
+    value = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+def hamming(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+class BKTree:
+    """Burkhard-Keller tree over Hamming distance for near-duplicate lookup."""
+
+    def __init__(self):
+        self._root: Optional[list] = None  # [hash, filename, {distance: child}]
+
+    def add(self, value: int, filename: str) -> None:
+        if self._root is None:
+            self._root = [value, filename, {}]
+            return
+        node = self._root
+        while True:
+            distance = hamming(value, node[0])
+            if distance == 0 and node[1] == filename:
+                return
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = [value, filename, {}]
+                return
+            node = child
+
+    def search(self, value: int, max_distance: int) -> list[tuple[int, str]]:
+        """Return (distance, filename) pairs within ``max_distance``, closest first."""
+        if self._root is None:
+            return []
+        matches = []
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            distance = hamming(value, node[0])
+            if distance <= max_distance:
+                matches.append((distance, node[1]))
+            for edge, child in node[2].items():
+                if distance - max_distance <= edge <= distance + max_distance:
+                    stack.append(child)
+        return sorted(matches)
+
+
+class PHashIndex:
+    """Persistent perceptual-hash index shared by the scraper, uploads and indexers.
+
+    Entries are appended to a text file (``<hex hash> <filename>`` per line), so
+    several processes can add to it; each instance picks up lines appended by
+    others before every lookup. Removals are appended as ``- <filename>``
+    tombstones; the BK-tree keeps the node but lookups skip it.
+    """
+
+    def __init__(self, index_file: Optional[Path] = None):
+        self._index_file = index_file or settings.phash_index_file
+        self._tree = BKTree()
+        self._hashes: dict[str, int] = {}
+        self._offset = 0
+        self._lock = threading.Lock()
+
+    def _sync(self) -> None:
+        if not self._index_file.exists():
+            return
+        with open(self._index_file, "rb") as f:
+            f.seek(self._offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # partially written by another process
+                self._offset += len(line)
+                hex_hash, _, filename = line.decode().rstrip("\n").partition(" ")
+                if not filename:
+                    continue
+                if hex_hash == "-":
+                    self._hashes.pop(filename, None)
+                else:
+                    self._insert(int(hex_hash, 16), filename)
+
+    def _insert(self, value: int, filename: str) -> None:
+        self._hashes[filename] = value
+        self._tree.add(value, filename)
+
+    def _find(self, value: int, filename: Optional[str]) -> Optional[str]:
+        for distance, match in self._tree.search(value, settings.phash_max_distance):
+            current = self._hashes.get(match)
+            # Skip removed files and nodes left behind by a re-added filename.
+            if current is None or hamming(value, current) != distance:
+                continue
+            if match != filename:
+                return match
+        return None
+
+    def _append(self, value: int, filename: str) -> None:
+        if self._hashes.get(filename) == value:
+            return
+        self._index_file.parent.mkdir(parents=True, exist_ok=True)
+        with open(self._index_file, "a") as f:
+            f.write(f"{value:016x} {filename}\n")
+        self._sync()
+
+    def find_duplicate(self, value: int, filename: Optional[str] = None) -> Optional[str]:
+        """Return an already-indexed file within the configured distance, if any."""
+        with self._lock:
+            self._sync()
+            return self._find(value, filename)
+
+    def add(self, value: int, filename: str) -> None:
+        with self._lock:
+            self._sync()
+            self._append(value, filename)
+
+    def remove(self, filename: str) -> None:
+        """Forget a file (deleted, or failed to index) so it no longer blocks re-uploads."""
+        with self._lock:
+            self._sync()
+            if filename not in self._hashes:
+                return
+            with open(self._index_file, "a") as f:
+                f.write(f"- {filename}\n")
+            self._sync()
+
+    def check_and_add(self, source: ImageSource, filename: str) -> Optional[str]:
+        """Hash an image; return the file it duplicates, or record it and return None."""
+        if not settings.phash_enabled:
+            return None
+        value = dhash(source)
+        # Search and append under one lock so concurrent near-duplicates
+        # cannot both pass the check.
+        with self._lock:
+            self._sync()
+            duplicate = self._find(value, filename)
+            if duplicate is None:
+                self._append(value, filename)
+        return duplicate
+
+
+phash_index = PHashIndex()
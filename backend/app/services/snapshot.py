@@ -0,0 +1,152 @@
+"""
+Export a model's collection to a portable snapshot and bulk-load it back.
+
+A snapshot is a directory with:
+    manifest.json   model, vector size, point count and index config
+    vectors.f32     row-major little-endian float32 matrix (count x dim)
+    points.jsonl    one {"id", "payload"} object per row, in vector order
+
+Vectors are written as they are scrolled, so export memory stays at one
+batch; on import the matrix is memory-mapped and sliced per batch.
+"""
+
+import json
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Optional
+
+import numpy as np
+
+from app.models.clip_models import MODEL_REGISTRY, get_collection_name
+from app.services.vector_store import VectorStore, get_index_config
+
+FORMAT_VERSION = 1
+MANIFEST_FILE = "manifest.json"
+VECTORS_FILE = "vectors.f32"
+POINTS_FILE = "points.jsonl"
+
+
+def export_snapshot(
+    store: VectorStore,
+    model_id: str,
+    out_dir: Path,
+    batch_size: int = 1000,
+    progress: Optional[Callable[[int], None]] = None,
+) -> dict:
+    """Stream ``model_id``'s collection into ``out_dir``. Returns the manifest."""
+    if model_id not in MODEL_REGISTRY:
+        raise ValueError(f"Unknown model: {model_id}")
+    if store.get_collection_info(model_id) is None:
+        raise ValueError(f"No collection for {model_id}")
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    dim = MODEL_REGISTRY[model_id].vector_dim
+    count = 0
+    with open(out_dir / VECTORS_FILE, "wb") as vectors_file, \
+            open(out_dir / POINTS_FILE, "w") as points_file:
+        for ids, vectors, payloads in store.iter_points(model_id, batch_size):
+            if vectors.shape[1] != dim:
+                raise ValueError(f"Expected {dim}-d vectors, got {vectors.shape[1]}")
+            vectors_file.write(np.ascontiguousarray(vectors, dtype="<f4").tobytes())
+            points_file.writelines(
+                json.dumps({"id": point_id, "payload": payload}) + "\n"
+                for point_id, payload in zip(ids, payloads)
+            )
+            count += len(ids)
+            if progress:
+                progress(count)
+
+    manifest = {
+        "format_version": FORMAT_VERSION,
+        "model_id": model_id,
+        "collection": get_collection_name(model_id),
+        "vector_dim": dim,
+        "dtype": "<f4",
+        "count": count,
+        "index_config": get_index_config(model_id),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+    }
+    (out_dir / MANIFEST_FILE).write_text(json.dumps(manifest, indent=2))
+    return manifest
+
+
+def read_manifest(snapshot_dir: Path) -> dict:
+    manifest = json.loads((snapshot_dir / MANIFEST_FILE).read_text())
+    if manifest.get("format_version") != FORMAT_VERSION:
+        raise ValueError(f"Unsupported snapshot format: {manifest.get('format_version')}")
+    return manifest
+
+
+def import_snapshot(
+    store: VectorStore,
+    snapshot_dir: Path,
+    model_id: Optional[str] = None,
+    batch_size: int = 1000,
+    workers: int = 4,
+    recreate: bool = False,
+    progress: Optional[Callable[[int], None]] = None,
+) -> int:
+    """Bulk-load a snapshot with parallel batched upserts. Returns points loaded.
+
+    HNSW building is paused for the duration of the load and resumed at the
+    end, so Qdrant builds the index once instead of continuously.
+    """
+    manifest = read_manifest(snapshot_dir)
+    model_id = model_id or manifest["model_id"]
+    if model_id not in MODEL_REGISTRY:
+        raise ValueError(f"Unknown model: {model_id}")
+    dim, count = manifest["vector_dim"], manifest["count"]
+    if MODEL_REGISTRY[model_id].vector_dim != dim:
+        raise ValueError(
+            f"Snapshot has {dim}-d vectors; {model_id} expects "
+            f"{MODEL_REGISTRY[model_id].vector_dim}"
+        )
+
+    if recreate:
+        store.delete_collection(model_id)
+    store.ensure_collection(model_id)
+    if count == 0:
+        return 0
+
+    loaded = 0
+    lock = threading.Lock()
+
+    def upload(start: int, ids: list, payloads: list[dict]) -> None:
+        nonlocal loaded
+        store.upsert_arrays(model_id, ids, vectors[start:start + len(ids)], payloads)
+        with lock:
+            loaded += len(ids)
+            if progress:
+                progress(loaded)
+
+    try:
+        store.set_indexing(model_id, False)
+        vectors = np.memmap(
+            snapshot_dir / VECTORS_FILE, dtype=manifest["dtype"], mode="r", shape=(count, dim)
+        )
+        with ThreadPoolExecutor(max_workers=workers) as executor, \
+                open(snapshot_dir / POINTS_FILE) as points_file:
+            pending = set()
+            ids, payloads, start = [], [], 0
+            for row, line in enumerate(points_file):
+                point = json.loads(line)
+                ids.append(point["id"])
+                payloads.append(point["payload"])
+                if len(ids) == batch_size:
+                    pending.add(executor.submit(upload, start, ids, payloads))
+                    ids, payloads, start = [], [], row + 1
+                # Bound in-flight batches so memory stays flat on large snapshots.
+                if len(pending) >= workers * 2:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        future.result()
+            if ids:
+                pending.add(executor.submit(upload, start, ids, payloads))
+            for future in pending:
+                future.result()
+    finally:
+        store.set_indexing(model_id, True)
+
+    return loaded
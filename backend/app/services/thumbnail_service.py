@@ -0,0 +1,98 @@
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+from typing import Optional
+
+from PIL import Image, ImageOps
+
+from app.config import settings
+from app.utils.metrics import record_cache, stage_timer
+
+FORMATS = {
+    "webp": ("WEBP", "image/webp"),
+    "jpeg": ("JPEG", "image/jpeg"),
+}
+
+
+def file_signature(path: Path) -> str:
+    """Short digest of a file's identity (name, size, mtime)."""
+    stat = path.stat()
+    key = f"{path.name}:{stat.st_size}:{stat.st_mtime_ns}"
+    return hashlib.sha1(key.encode()).hexdigest()[:16]
+
+
+def etag_for(path: Path) -> str:
+    return f'"{file_signature(path)}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+class ThumbnailService:
+    def normalize_width(self, width: Optional[int]) -> Optional[int]:
+        """Round a requested width up to the nearest configured size.
+
+        Widths above the largest size map to ``None`` (full resolution), so a
+        request is never served smaller than it asked for. Keeps the disk
+        cache bounded to a few variants per image.
+        """
+        if width is None:
+            return None
+        for size in sorted(settings.thumbnail_sizes):
+            if width <= size:
+                return size
+        return None
+
+    def variant_path(self, source: Path, width: Optional[int], fmt: str) -> Path:
+        ext = "jpg" if fmt == "jpeg" else fmt
+        size = width or "full"
+        return settings.thumbnails_dir / f"{source.stem}.{file_signature(source)}.{size}.{ext}"
+
+    def get_variant(
+        self, source: Path, width: Optional[int] = None, fmt: Optional[str] = None
+    ) -> Path:
+        """Return the cached resized variant of ``source``, generating it if needed."""
+        fmt = fmt or settings.thumbnail_format
+        if fmt not in FORMATS:
+            raise ValueError(f"Unsupported format: {fmt}")
+        width = self.normalize_width(width)
+
+        path = self.variant_path(source, width, fmt)
+        hit = path.exists()
+        record_cache("thumbnail", hit)
+        if not hit:
+            with stage_timer("thumbnail"):
+                self._generate(source, path, width, fmt)
+        return path
+
+    def generate_defaults(self, source: Path) -> None:
+        """Pre-generate the common gallery sizes for a newly indexed image."""
+        for width in settings.thumbnail_sizes:
+            self.get_variant(source, width)
+
+    def _generate(self, source: Path, path: Path, width: Optional[int], fmt: str) -> None:
+        pil_format, _ = FORMATS[fmt]
+        with Image.open(source) as image:
+            image = ImageOps.exif_transpose(image).convert("RGB")
+            if width and image.width > width:
+                height = max(1, round(image.height * width / image.width))
+                image = image.resize((width, height), Image.LANCZOS)
+
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # Write then rename so concurrent requests never serve a partial file.
+            fd, tmp_name = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as tmp:
+                    image.save(tmp, pil_format, quality=settings.thumbnail_quality)
+                os.replace(tmp_name, path)
+            except BaseException:
+                Path(tmp_name).unlink(missing_ok=True)
+                raise
+
+
+thumbnail_service = ThumbnailService()
@@ -1,20 +1,120 @@
-from typing import Optional
-from qdrant_client import QdrantClient
-from qdrant_client.models import Distance, VectorParams, PointStruct
+import asyncio
+from typing import Awaitable, Callable, Iterator, Optional, TypeVar, Union
+
+import grpc
+import httpx
+import numpy as np
+from qdrant_client import AsyncQdrantClient, QdrantClient
+from qdrant_client.http.exceptions import ResponseHandlingException
+from qdrant_client.models import (
+    Batch,
+    CollectionParamsDiff,
+    CreateAlias,
+    CreateAliasOperation,
+    DeleteAlias,
+    DeleteAliasOperation,
+    Distance,
+    FieldCondition,
+    Filter,
+    FilterSelector,
+    HnswConfigDiff,
+    MatchValue,
+    OptimizersConfigDiff,
+    PointStruct,
+    QueryRequest,
+    SearchParams,
+    VectorParams,
+    VectorParamsDiff,
+)
 from app.config import settings
 from app.models.clip_models import MODEL_REGISTRY, get_collection_name
+from app.utils.metrics import stage_timer
+
+FACE_COLLECTION_ID = "faces"
+FACE_VECTOR_DIM = 128
+# Qdrant's default segment size (KB of vectors) above which HNSW is built
+DEFAULT_INDEXING_THRESHOLD = 20000
+
+INDEX_CONFIG_KEYS = (
+    "hnsw_m",
+    "hnsw_ef_construct",
+    "hnsw_search_ef",
+    "on_disk_vectors",
+    "on_disk_payload",
+)
+
+
+T = TypeVar("T")
+
+# Connection-level failures worth retrying; bad requests are not.
+RETRYABLE_ERRORS = (ResponseHandlingException, httpx.TransportError)
+RETRYABLE_GRPC_CODES = (
+    grpc.StatusCode.UNAVAILABLE,
+    grpc.StatusCode.DEADLINE_EXCEEDED,
+    grpc.StatusCode.RESOURCE_EXHAUSTED,
+)
+
+
+def is_retryable(error: Exception) -> bool:
+    if isinstance(error, RETRYABLE_ERRORS):
+        return True
+    # NOT_FOUND, INVALID_ARGUMENT etc. won't succeed on a second attempt.
+    return isinstance(error, grpc.RpcError) and error.code() in RETRYABLE_GRPC_CODES
+
+
+Vector = Union[np.ndarray, list[float]]
+
+
+def to_client_vectors(vectors: Vector) -> list:
+    """Convert an embedding (1-D) or batch (2-D) to the float lists the client sends.
+
+    Embeddings stay NumPy arrays through the pipeline; this is the one place
+    they become Python floats, in a single C-level pass per batch.
+    """
+    return np.asarray(vectors, dtype=np.float32).tolist()
+
+
+def model_for_collection(collection_name: Optional[str]) -> Optional[str]:
+    """Reverse of ``get_collection_name`` over the registered models."""
+    for model_id in MODEL_REGISTRY:
+        if get_collection_name(model_id) == collection_name:
+            return model_id
+    return None
+
+
+def client_options() -> dict:
+    """Connection settings shared by the sync and async clients."""
+    return {
+        "host": settings.qdrant_host,
+        "port": settings.qdrant_port,
+        "grpc_port": settings.qdrant_grpc_port,
+        "prefer_grpc": settings.qdrant_prefer_grpc,
+        "timeout": settings.qdrant_timeout,
+    }
+
+
+def face_filter(filename: str) -> FilterSelector:
+    """Selects every face point detected in ``filename``."""
+    return FilterSelector(
+        filter=Filter(must=[FieldCondition(key="filename", match=MatchValue(value=filename))])
+    )
+
+
+def get_index_config(model_id: str) -> dict:
+    """Index settings for a model: global defaults with per-model overrides."""
+    config = {key: getattr(settings, key) for key in INDEX_CONFIG_KEYS}
+    overrides = settings.collection_index_overrides.get(model_id, {})
+    config.update({k: v for k, v in overrides.items() if k in INDEX_CONFIG_KEYS})
+    return config
 
 
 class VectorStore:
-    def __init__(self):
-        self._client: Optional[QdrantClient] = None
+    def __init__(self, client: Optional[QdrantClient] = None):
+        self._client: Optional[QdrantClient] = client
 
     def _get_client(self) -> QdrantClient:
         if self._client is None:
-            self._client = QdrantClient(
-                host=settings.qdrant_host,
-                port=settings.qdrant_port,
-            )
+            self._client = QdrantClient(**client_options())
         return self._client
 
     def ensure_collection(self, model_id: str) -> str:
@@ -24,15 +124,41 @@ class VectorStore:
 
         collections = client.get_collections().collections
         if not any(c.name == collection_name for c in collections):
+            config = get_index_config(model_id)
             client.create_collection(
                 collection_name=collection_name,
                 vectors_config=VectorParams(
                     size=vector_size,
                     distance=Distance.COSINE,
+                    on_disk=config["on_disk_vectors"],
                 ),
+                hnsw_config=HnswConfigDiff(
+                    m=config["hnsw_m"],
+                    ef_construct=config["hnsw_ef_construct"],
+                ),
+                on_disk_payload=config["on_disk_payload"],
             )
         return collection_name
 
+    def apply_index_config(self, model_id: str) -> dict:
+        """Push the configured HNSW and storage settings to an existing collection.
+
+        Qdrant rebuilds the index in the background; searches keep working.
+        """
+        client = self._get_client()
+        collection_name = self.ensure_collection(model_id)
+        config = get_index_config(model_id)
+        client.update_collection(
+            collection_name=collection_name,
+            vectors_config={"": VectorParamsDiff(on_disk=config["on_disk_vectors"])},
+            hnsw_config=HnswConfigDiff(
+                m=config["hnsw_m"],
+                ef_construct=config["hnsw_ef_construct"],
+            ),
+            collection_params=CollectionParamsDiff(on_disk_payload=config["on_disk_payload"]),
+        )
+        return {"collection": collection_name, **config}
+
     def get_collection_info(self, model_id: str) -> Optional[dict]:
         client = self._get_client()
         collection_name = get_collection_name(model_id)
@@ -67,24 +193,124 @@ class VectorStore:
                     pass
         return indexed
 
-    def upsert(self, model_id: str, id: str, vector: list[float], payload: dict) -> None:
+    def upsert(self, model_id: str, id: str, vector: Vector, payload: dict) -> None:
         client = self._get_client()
         collection_name = self.ensure_collection(model_id)
-        client.upsert(
-            collection_name=collection_name,
-            points=[PointStruct(id=id, vector=vector, payload=payload)],
+        with stage_timer("qdrant_upsert", model_id):
+            client.upsert(
+                collection_name=collection_name,
+                points=[PointStruct(id=id, vector=to_client_vectors(vector), payload=payload)],
+            )
+
+    def upsert_arrays(
+        self, model_id: str, ids: list, vectors: np.ndarray, payloads: list[dict]
+    ) -> None:
+        """Upsert a column-oriented batch (one vector row per id)."""
+        if not ids:
+            return
+        client = self._get_client()
+        collection_name = self.ensure_collection(model_id)
+        with stage_timer("qdrant_upsert", model_id):
+            client.upsert(
+                collection_name=collection_name,
+                points=Batch(ids=ids, vectors=to_client_vectors(vectors), payloads=payloads),
+            )
+
+    def iter_points(
+        self, model_id: str, batch_size: int = 1000, with_vectors: bool = True
+    ) -> Iterator[tuple[list, Optional[np.ndarray], list[dict]]]:
+        """Scroll a whole collection as (ids, vectors, payloads) batches.
+
+        With ``with_vectors=False`` only ids and payloads are fetched and the
+        vectors slot is None.
+        """
+        client = self._get_client()
+        collection_name = get_collection_name(model_id)
+        offset = None
+        while True:
+            points, offset = client.scroll(
+                collection_name=collection_name,
+                limit=batch_size,
+                offset=offset,
+                with_vectors=with_vectors,
+                with_payload=True,
+            )
+            if points:
+                yield (
+                    [p.id for p in points],
+                    np.asarray([p.vector for p in points], dtype=np.float32) if with_vectors else None,
+                    [p.payload or {} for p in points],
+                )
+            if offset is None:
+                return
+
+    def count(self, model_id: str) -> int:
+        client = self._get_client()
+        return client.count(collection_name=get_collection_name(model_id), exact=True).count
+
+    def get_aliases(self) -> dict[str, str]:
+        """Map of alias name -> collection name."""
+        client = self._get_client()
+        return {a.alias_name: a.collection_name for a in client.get_aliases().aliases}
+
+    def update_aliases(
+        self, assign: Optional[dict[str, str]] = None, remove: Optional[list[str]] = None
+    ) -> None:
+        """Point aliases at model collections and drop others, in one atomic call.
+
+        ``assign`` maps alias name -> model id.
+        """
+        assign, remove = assign or {}, remove or []
+        existing = self.get_aliases()
+        operations = [
+            DeleteAliasOperation(delete_alias=DeleteAlias(alias_name=alias))
+            for alias in [*assign, *remove]
+            if alias in existing
+        ]
+        operations += [
+            CreateAliasOperation(create_alias=CreateAlias(
+                collection_name=get_collection_name(model_id), alias_name=alias
+            ))
+            for alias, model_id in assign.items()
+        ]
+        if operations:
+            self._get_client().update_collection_aliases(change_aliases_operations=operations)
+
+    def set_indexing(self, model_id: str, enabled: bool) -> None:
+        """Pause or resume HNSW building, e.g. around a bulk load."""
+        client = self._get_client()
+        client.update_collection(
+            collection_name=get_collection_name(model_id),
+            optimizers_config=OptimizersConfigDiff(
+                indexing_threshold=DEFAULT_INDEXING_THRESHOLD if enabled else 0
+            ),
         )
 
-    def search(self, model_id: str, vector: list[float], limit: int = 10) -> list[dict]:
+    def search(
+        self,
+        model_id: str,
+        vector: Vector,
+        limit: int = 10,
+        ef: Optional[int] = None,
+        exact: bool = False,
+    ) -> list[dict]:
+        """Nearest-neighbour search.
+
+        ``ef`` overrides the model's configured HNSW search breadth; ``exact``
+        bypasses the index entirely (brute force, full recall).
+        """
         client = self._get_client()
         collection_name = get_collection_name(model_id)
+        hnsw_ef = ef or get_index_config(model_id)["hnsw_search_ef"]
 
         try:
-            results = client.query_points(
-                collection_name=collection_name,
-                query=vector,
-                limit=limit,
-            )
+            with stage_timer("qdrant_exact_query" if exact else "qdrant_query", model_id):
+                results = client.query_points(
+                    collection_name=collection_name,
+                    query=to_client_vectors(vector),
+                    limit=limit,
+                    search_params=SearchParams(hnsw_ef=hnsw_ef, exact=exact),
+                )
             return [
                 {"id": str(r.id), "score": r.score, "payload": r.payload}
                 for r in results.points
@@ -118,5 +344,243 @@ class VectorStore:
         except Exception:
             pass
 
+    def ensure_face_collection(self) -> str:
+        client = self._get_client()
+        collection_name = get_collection_name(FACE_COLLECTION_ID)
+
+        collections = client.get_collections().collections
+        if not any(c.name == collection_name for c in collections):
+            client.create_collection(
+                collection_name=collection_name,
+                vectors_config=VectorParams(
+                    size=FACE_VECTOR_DIM,
+                    distance=Distance.EUCLID,
+                ),
+            )
+        return collection_name
+
+    def get_face_collection_info(self) -> Optional[dict]:
+        client = self._get_client()
+        collection_name = get_collection_name(FACE_COLLECTION_ID)
+        try:
+            info = client.get_collection(collection_name)
+            return {
+                "name": collection_name,
+                "points_count": info.points_count,
+                "vector_dim": FACE_VECTOR_DIM,
+            }
+        except Exception:
+            return None
+
+    def upsert_faces(self, points: list[dict]) -> None:
+        """Upsert face points given as dicts with ``id``, ``vector`` and ``payload``."""
+        if not points:
+            return
+        client = self._get_client()
+        collection_name = self.ensure_face_collection()
+        with stage_timer("qdrant_upsert", FACE_COLLECTION_ID):
+            client.upsert(
+                collection_name=collection_name,
+                points=[
+                    PointStruct(id=p["id"], vector=to_client_vectors(p["vector"]), payload=p["payload"])
+                    for p in points
+                ],
+            )
+
+    def delete_faces(self, filename: str) -> None:
+        """Remove all face points of one gallery image."""
+        client = self._get_client()
+        collection_name = get_collection_name(FACE_COLLECTION_ID)
+        if client.collection_exists(collection_name):
+            client.delete(collection_name=collection_name, points_selector=face_filter(filename))
+
+    def search_faces(
+        self,
+        vectors: list[Vector],
+        limit: int = 100,
+        max_distance: Optional[float] = None,
+    ) -> list[list[dict]]:
+        """Run one nearest-neighbour query per vector in a single batched request.
+
+        Scores are Euclidean distances (lower is closer), matching
+        ``face_recognition.face_distance``.
+        """
+        if not vectors:
+            return []
+        client = self._get_client()
+        collection_name = get_collection_name(FACE_COLLECTION_ID)
+
+        try:
+            with stage_timer("qdrant_query", FACE_COLLECTION_ID):
+                responses = client.query_batch_points(
+                    collection_name=collection_name,
+                    requests=[
+                        QueryRequest(
+                            query=to_client_vectors(vector),
+                            limit=limit,
+                            score_threshold=max_distance,
+                            with_payload=True,
+                        )
+                        for vector in vectors
+                    ],
+                )
+            return [
+                [
+                    {"id": str(r.id), "score": r.score, "payload": r.payload}
+                    for r in response.points
+                ]
+                for response in responses
+            ]
+        except Exception:
+            return [[] for _ in vectors]
+
+
+class AsyncVectorStore:
+    """Non-blocking counterpart of ``VectorStore`` for the async routes.
+
+    One ``AsyncQdrantClient`` is shared per process: over REST it keeps a
+    pooled httpx connection set, over gRPC a single multiplexed channel, so
+    concurrent requests overlap their Qdrant round trips.
+    """
+
+    def __init__(self, client: Optional[AsyncQdrantClient] = None):
+        self._client: Optional[AsyncQdrantClient] = client
+
+    def _get_client(self) -> AsyncQdrantClient:
+        if self._client is None:
+            options = client_options()
+            if not settings.qdrant_prefer_grpc:
+                options["limits"] = httpx.Limits(
+                    max_connections=settings.qdrant_max_connections,
+                    max_keepalive_connections=settings.qdrant_max_connections,
+                )
+            self._client = AsyncQdrantClient(**options)
+        return self._client
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+
+    async def _retry(self, call: Callable[[], Awaitable[T]]) -> T:
+        delay = settings.qdrant_retry_backoff
+        for attempt in range(settings.qdrant_retries + 1):
+            try:
+                return await call()
+            except Exception as e:
+                if not is_retryable(e) or attempt == settings.qdrant_retries:
+                    raise
+                await asyncio.sleep(delay)
+                delay *= 2
+
+    async def get_aliases(self) -> dict[str, str]:
+        client = self._get_client()
+        response = await self._retry(client.get_aliases)
+        return {a.alias_name: a.collection_name for a in response.aliases}
+
+    async def get_collection_info(self, model_id: str) -> Optional[dict]:
+        client = self._get_client()
+        collection_name = get_collection_name(model_id)
+        try:
+            info = await self._retry(lambda: client.get_collection(collection_name))
+            return {
+                "name": collection_name,
+                "points_count": info.points_count,
+                "vector_dim": MODEL_REGISTRY[model_id].vector_dim,
+            }
+        except Exception:
+            return None
+
+    async def list_indexed_models(self) -> list[dict]:
+        client = self._get_client()
+        collections = (await self._retry(client.get_collections)).collections
+        collection_names = {c.name for c in collections}
+
+        model_ids = [
+            model_id for model_id in MODEL_REGISTRY
+            if get_collection_name(model_id) in collection_names
+        ]
+        infos = await asyncio.gather(*(self.get_collection_info(m) for m in model_ids))
+        return [
+            {
+                "model_id": model_id,
+                "collection": info["name"],
+                "points_count": info["points_count"],
+                "vector_dim": info["vector_dim"],
+            }
+            for model_id, info in zip(model_ids, infos)
+            if info is not None
+        ]
+
+    async def search(
+        self,
+        model_id: str,
+        vector: Vector,
+        limit: int = 10,
+        ef: Optional[int] = None,
+        exact: bool = False,
+    ) -> list[dict]:
+        """Nearest-neighbour search; same parameters as ``VectorStore.search``."""
+        client = self._get_client()
+        collection_name = get_collection_name(model_id)
+        hnsw_ef = ef or get_index_config(model_id)["hnsw_search_ef"]
+
+        try:
+            with stage_timer("qdrant_exact_query" if exact else "qdrant_query", model_id):
+                query = to_client_vectors(vector)
+                results = await self._retry(lambda: client.query_points(
+                    collection_name=collection_name,
+                    query=query,
+                    limit=limit,
+                    search_params=SearchParams(hnsw_ef=hnsw_ef, exact=exact),
+                ))
+            return [
+                {"id": str(r.id), "score": r.score, "payload": r.payload}
+                for r in results.points
+            ]
+        except Exception:
+            return []
+
+    async def list_all(self, model_id: str) -> list[dict]:
+        client = self._get_client()
+        collection_name = get_collection_name(model_id)
+
+        try:
+            results = await self._retry(
+                lambda: client.scroll(collection_name=collection_name, limit=1000)
+            )
+            return [{"id": str(r.id), "payload": r.payload} for r in results[0]]
+        except Exception:
+            return []
+
+    async def get_payload(self, model_id: str, id: str) -> Optional[dict]:
+        client = self._get_client()
+        collection_name = get_collection_name(model_id)
+        try:
+            points = await self._retry(
+                lambda: client.retrieve(collection_name=collection_name, ids=[id])
+            )
+        except Exception:
+            return None
+        return points[0].payload if points else None
+
+    async def delete(self, model_id: str, id: str) -> None:
+        client = self._get_client()
+        collection_name = get_collection_name(model_id)
+        await self._retry(lambda: client.delete(
+            collection_name=collection_name,
+            points_selector=[id],
+        ))
+
+    async def delete_faces(self, filename: str) -> None:
+        client = self._get_client()
+        collection_name = get_collection_name(FACE_COLLECTION_ID)
+        if await self._retry(lambda: client.collection_exists(collection_name)):
+            await self._retry(lambda: client.delete(
+                collection_name=collection_name,
+                points_selector=face_filter(filename),
+            ))
+
 
 vector_store = VectorStore()
+async_vector_store = AsyncVectorStore()
@@ -0,0 +1,70 @@
+import io
+import math
+from pathlib import Path
+from typing import Optional, Union
+
+import numpy as np
+from PIL import Image, ImageOps
+
+ImageSource = Union[Path, str, bytes]
+
+
+def _draft(image: Image.Image, min_side: Optional[int], max_side: Optional[int]) -> None:
+    """Ask the JPEG decoder for the smallest power-of-two reduction that still
+    keeps the shorter side >= ``min_side`` (or the longer side >= ``max_side``).
+
+    Must run before the pixel data is loaded; other formats are left untouched.
+    """
+    if image.format != "JPEG":
+        return
+    width, height = image.size
+    if min_side:
+        scale = min_side / min(width, height)
+    elif max_side:
+        scale = max_side / max(width, height)
+    else:
+        return
+    if scale < 1:
+        image.draft("RGB", (math.ceil(width * scale), math.ceil(height * scale)))
+
+
+def open_image_scaled(
+    source: ImageSource, min_side: Optional[int] = None, max_side: Optional[int] = None
+) -> tuple[Image.Image, float]:
+    """Open an upright RGB image, decoding large JPEGs at reduced resolution.
+
+    Returns the image and its scale relative to the full-size original, so
+    coordinates found on it can be mapped back.
+    """
+    if isinstance(source, bytes):
+        source = io.BytesIO(source)
+    image = Image.open(source)
+    full_width = image.width
+    _draft(image, min_side, max_side)
+    scale = image.width / full_width
+    ImageOps.exif_transpose(image, in_place=True)
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+    else:
+        image.load()
+    return image, scale
+
+
+def open_image(
+    source: ImageSource, min_side: Optional[int] = None, max_side: Optional[int] = None
+) -> Image.Image:
+    """Open an upright RGB image from a path or from in-memory bytes.
+
+    ``min_side``/``max_side`` bound how far JPEG decoding may reduce the image;
+    without them it is decoded at full size.
+    """
+    return open_image_scaled(source, min_side, max_side)[0]
+
+
+def load_image_array(
+    source: ImageSource, max_side: Optional[int] = None
+) -> tuple[np.ndarray, float]:
+    """Decode to an HxWx3 uint8 array (as face_recognition expects) plus its scale."""
+    image, scale = open_image_scaled(source, max_side=max_side)
+    return np.array(image), scale
+
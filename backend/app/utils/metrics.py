@@ -0,0 +1,228 @@
+"""
+Minimal in-process metrics with Prometheus text exposition.
+
+Each metric keeps plain counters behind a lock, so recording a sample costs a
+dict lookup and a few additions; nothing is formatted until /metrics is read.
+"""
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator
+
+DEFAULT_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+)
+
+_registry: list["_Metric"] = []
+_capture = threading.local()
+
+
+def _format_labels(labelnames: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _key(self, labels: dict) -> tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def render(self) -> list[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type_name}"]
+
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = ()):
+        super().__init__(name, help, labelnames)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> list[str]:
+        lines = super().render()
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Gauge(_Metric):
+    """Gauge whose samples are read from a callback at scrape time."""
+
+    type_name = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: tuple[str, ...] = (),
+        collect: Callable[[], dict[tuple[str, ...], float]] = None,
+    ):
+        super().__init__(name, help, labelnames)
+        self._collect = collect
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def set(self, value: float, **labels) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def set_function(self, collect: Callable[[], dict[tuple[str, ...], float]]) -> None:
+        self._collect = collect
+
+    def render(self) -> list[str]:
+        lines = super().render()
+        with self._lock:
+            values = dict(self._values)
+        if self._collect is not None:
+            try:
+                values.update(self._collect())
+            except Exception:
+                pass
+        for key, value in values.items():
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # key -> [per-bucket counts..., +Inf count, sum]
+        self._values: dict[tuple[str, ...], list[float]] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        captured = getattr(_capture, "samples", None)
+        if captured is not None:
+            captured.append((self.name, value, labels))
+            return
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._values.get(key)
+            if counts is None:
+                counts = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            counts[index] += 1
+            counts[-1] += value
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def render(self) -> list[str]:
+        lines = super().render()
+        with self._lock:
+            items = [(key, list(counts)) for key, counts in self._values.items()]
+        for key, counts in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts[:-1]):
+                cumulative += count
+                le = _format_labels(self.labelnames, key, f'le="{_format_value(bound)}"')
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(counts[-1])}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+def render() -> str:
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+STAGE_SECONDS = Histogram(
+    "joyuri_stage_seconds",
+    "Latency of hot-path stages (decode, preprocess, forward, normalize, qdrant, face).",
+    ("stage", "model"),
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    "joyuri_http_request_seconds",
+    "HTTP request latency by route.",
+    ("method", "route", "status"),
+)
+CACHE_REQUESTS = Counter(
+    "joyuri_cache_requests_total",
+    "Cache lookups by cache and result (hit/miss).",
+    ("cache", "result"),
+)
+MODEL_MEMORY_BYTES = Gauge(
+    "joyuri_model_memory_bytes",
+    "Parameter memory of loaded models.",
+    ("model",),
+)
+QUEUE_DEPTH = Gauge(
+    "joyuri_queue_depth",
+    "Items waiting in background queues.",
+    ("queue",),
+)
+
+
+@contextmanager
+def capture() -> Iterator[list[tuple[str, float, dict]]]:
+    """Collect histogram samples observed in this thread instead of storing them.
+
+    For worker processes, whose registry /metrics never renders: ship the
+    samples back and ``replay`` them in the parent.
+    """
+    previous = getattr(_capture, "samples", None)
+    _capture.samples = samples = []
+    try:
+        yield samples
+    finally:
+        _capture.samples = previous
+
+
+def replay(samples: list[tuple[str, float, dict]]) -> None:
+    metrics = {metric.name: metric for metric in _registry}
+    for name, value, labels in samples:
+        metrics[name].observe(value, **labels)
+
+
+def stage_timer(stage: str, model: str = ""):
+    """Time a block into joyuri_stage_seconds."""
+    return STAGE_SECONDS.time(stage=stage, model=model)
+
+
+def record_cache(cache: str, hit: bool) -> None:
+    CACHE_REQUESTS.inc(cache=cache, result="hit" if hit else "miss")
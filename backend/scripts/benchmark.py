@@ -0,0 +1,251 @@
+"""
+Benchmark indexing throughput, search latency and face verification latency.
+
+Runs fully offline: images are generated synthetically, Qdrant runs in-process
+(":memory:" or a local path) and, unless --real-models is given, every
+MODEL_REGISTRY entry is replaced by a stub loader with the same vector size and
+input resolution. Results are written as JSON so runs can be compared.
+"""
+
+import sys
+import json
+import zlib
+import time
+import uuid
+import random
+import argparse
+import platform
+from datetime import datetime, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import numpy as np
+import torch
+from PIL import Image, ImageDraw
+from qdrant_client import QdrantClient
+
+from app.models.clip_models import MODEL_REGISTRY, CLIPModelConfig
+from app.services.clip_service import ModelLoader, MultiModelCLIPService
+from app.services.vector_store import VectorStore
+
+QUERIES = ["smiling", "concert outfit", "standing on stage", "close-up portrait", "red dress"]
+
+
+class StubLoader(ModelLoader):
+    """CPU stand-in: resize, pool and randomly project to the model's vector size."""
+
+    def __init__(self):
+        self.model = None
+        self.device = None
+
+    def load(self, config: CLIPModelConfig, device: str) -> None:
+        self.model_id = config.id
+        self.device = device
+        self.input_size = config.image_size
+        generator = torch.Generator().manual_seed(0)
+        self.model = torch.nn.Linear(3 * 32 * 32, config.vector_dim)
+        with torch.no_grad():
+            self.model.weight.copy_(torch.randn(self.model.weight.shape, generator=generator))
+        self.model.eval()
+
+    def _preprocess_images(self, images: list[Image.Image]) -> torch.Tensor:
+        size = (self.input_size, self.input_size)
+        arrays = [np.asarray(image.resize(size), dtype=np.float32) / 255.0 for image in images]
+        return torch.from_numpy(np.stack(arrays)).permute(0, 3, 1, 2)
+
+    def _forward_images(self, inputs: torch.Tensor) -> torch.Tensor:
+        pooled = torch.nn.functional.adaptive_avg_pool2d(inputs, 32)
+        return self.model(pooled.flatten(1))
+
+    def _tokenize(self, texts: list[str]) -> torch.Tensor:
+        rows = []
+        for text in texts:
+            generator = torch.Generator().manual_seed(zlib.crc32(text.encode()))
+            rows.append(torch.rand(3 * 32 * 32, generator=generator))
+        return torch.stack(rows)
+
+    def _forward_text(self, inputs: torch.Tensor) -> torch.Tensor:
+        return self.model(inputs)
+
+
+def make_corpus(out_dir: Path, count: int, size: int, seed: int) -> list[Path]:
+    """Write ``count`` random JPEGs of roughly ``size`` px to ``out_dir``."""
+    out_dir.mkdir(parents=True, exist_ok=True)
+    rng = random.Random(seed)
+    paths = []
+    for i in range(count):
+        path = out_dir / f"synthetic_{seed}_{size}_{i:05d}.jpg"
+        if not path.exists():
+            width, height = size, int(size * rng.uniform(0.75, 1.33))
+            image = Image.new("RGB", (width, height), tuple(rng.randrange(256) for _ in range(3)))
+            draw = ImageDraw.Draw(image)
+            for _ in range(12):
+                x0, y0 = rng.randrange(width), rng.randrange(height)
+                x1, y1 = x0 + rng.randrange(width // 2), y0 + rng.randrange(height // 2)
+                draw.ellipse((x0, y0, x1, y1), fill=tuple(rng.randrange(256) for _ in range(3)))
+            image.save(path, "JPEG", quality=90)
+        paths.append(path)
+    return paths
+
+
+def percentiles(samples: list[float]) -> dict:
+    if not samples:
+        return {}
+    ms = np.asarray(samples) * 1000
+    return {
+        "p50": round(float(np.percentile(ms, 50)), 3),
+        "p95": round(float(np.percentile(ms, 95)), 3),
+        "p99": round(float(np.percentile(ms, 99)), 3),
+        "mean": round(float(ms.mean()), 3),
+        "n": len(samples),
+    }
+
+
+def bench_model(
+    service: MultiModelCLIPService,
+    store: VectorStore,
+    model_id: str,
+    images: list[Path],
+    batch_size: int,
+    queries: int,
+) -> dict:
+    service.load_model(model_id)
+    store.delete_collection(model_id)
+
+    start = time.perf_counter()
+    for i in range(0, len(images), batch_size):
+        batch = images[i:i + batch_size]
+        embeddings = service.get_image_embeddings(batch, model_id)
+        store.upsert_arrays(
+            model_id,
+            [str(uuid.uuid4()) for _ in batch],
+            embeddings,
+            [{"filename": path.name} for path in batch],
+        )
+    index_seconds = time.perf_counter() - start
+
+    encode_times, query_times, search_times = [], [], []
+    for i in range(queries):
+        text = QUERIES[i % len(QUERIES)] + f" {i}"
+        t0 = time.perf_counter()
+        vector = service.get_text_embedding(text, model_id)
+        t1 = time.perf_counter()
+        store.search(model_id, vector, limit=12)
+        t2 = time.perf_counter()
+        encode_times.append(t1 - t0)
+        query_times.append(t2 - t1)
+        search_times.append(t2 - t0)
+
+    return {
+        "model_id": model_id,
+        "batch_size": batch_size,
+        "images": len(images),
+        "index_seconds": round(index_seconds, 3),
+        "index_images_per_sec": round(len(images) / index_seconds, 2) if index_seconds else None,
+        "search_latency_ms": percentiles(search_times),
+        "text_encode_latency_ms": percentiles(encode_times),
+        "qdrant_query_latency_ms": percentiles(query_times),
+    }
+
+
+def bench_verify(images: list[Path], rounds: int) -> dict:
+    try:
+        from app.services.face_service import detect_and_encode
+    except ImportError as e:
+        return {"skipped": f"face_recognition unavailable: {e}"}
+
+    contents = [path.read_bytes() for path in images[:rounds]]
+    samples = []
+    for content in contents:
+        start = time.perf_counter()
+        detect_and_encode(content)
+        samples.append(time.perf_counter() - start)
+    return {"detect_and_encode_latency_ms": percentiles(samples)}
+
+
+def compare(current: dict, baseline_path: Path) -> None:
+    baseline = json.loads(baseline_path.read_text())
+    previous = {(r["model_id"], r["batch_size"]): r for r in baseline.get("results", [])}
+    print(f"\nCompared with {baseline_path}:")
+    for r in current["results"]:
+        old = previous.get((r["model_id"], r["batch_size"]))
+        if not old:
+            continue
+        ips_old, ips_new = old["index_images_per_sec"], r["index_images_per_sec"]
+        p95_old, p95_new = old["search_latency_ms"]["p95"], r["search_latency_ms"]["p95"]
+        print(
+            f"  {r['model_id']} bs={r['batch_size']}: "
+            f"index {ips_old} -> {ips_new} img/s ({(ips_new / ips_old - 1) * 100:+.1f}%), "
+            f"search p95 {p95_old} -> {p95_new} ms ({(p95_new / p95_old - 1) * 100:+.1f}%)"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline indexing/search/verify benchmark")
+    parser.add_argument("--models", nargs="*", default=list(MODEL_REGISTRY.keys()))
+    parser.add_argument("--batch-sizes", nargs="*", type=int, default=[1, 8, 32])
+    parser.add_argument("--images", type=int, default=200, help="Synthetic corpus size")
+    parser.add_argument("--image-size", type=int, default=1024, help="Synthetic image width")
+    parser.add_argument("--queries", type=int, default=200, help="Search queries per run")
+    parser.add_argument("--verify-rounds", type=int, default=20)
+    parser.add_argument("--skip-verify", action="store_true")
+    parser.add_argument("--real-models", action="store_true", help="Use real loaders (needs weights)")
+    parser.add_argument("--qdrant", default=":memory:", help='":memory:" or a local storage path')
+    parser.add_argument("--corpus-dir", type=Path, default=Path("data/benchmark/corpus"))
+    parser.add_argument("--output", type=Path, default=None, help="JSON results file")
+    parser.add_argument("--compare", type=Path, default=None, help="Previous results JSON")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    np.random.seed(args.seed)
+    torch.manual_seed(args.seed)
+
+    images = make_corpus(args.corpus_dir, args.images, args.image_size, args.seed)
+    client = QdrantClient(":memory:") if args.qdrant == ":memory:" else QdrantClient(path=args.qdrant)
+    store = VectorStore(client)
+    service = MultiModelCLIPService(
+        loader_class=None if args.real_models else StubLoader, device="cpu"
+    )
+
+    results = []
+    for model_id in args.models:
+        for batch_size in args.batch_sizes:
+            result = bench_model(service, store, model_id, images, batch_size, args.queries)
+            results.append(result)
+            print(
+                f"{model_id:28s} bs={batch_size:<3d} "
+                f"{result['index_images_per_sec']:>8} img/s  "
+                f"search p50/p95/p99 {result['search_latency_ms']['p50']}/"
+                f"{result['search_latency_ms']['p95']}/{result['search_latency_ms']['p99']} ms"
+            )
+
+    report = {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "config": {k: str(v) if isinstance(v, Path) else v for k, v in vars(args).items()},
+        "platform": {
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "torch": torch.__version__,
+            "threads": torch.get_num_threads(),
+        },
+        "results": results,
+        "verify": None if args.skip_verify else bench_verify(images, args.verify_rounds),
+    }
+    if report["verify"]:
+        print(f"verify: {report['verify']}")
+
+    output = args.output or Path("data/benchmark") / (
+        f"results-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print(f"\nSaved results to {output}")
+
+    if args.compare:
+        compare(report, args.compare)
+
+
+if __name__ == "__main__":
+    main()
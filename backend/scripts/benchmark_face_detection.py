@@ -0,0 +1,175 @@
+"""
+Compare full-resolution and downscaled face detection.
+Reports per-image latency and how often both settings agree on the faces found.
+
+With --pipeline, compares the production path instead: detect_and_encode, which
+detects faces on a reduced-resolution JPEG decode and encodes them on the
+original, against a full-resolution decode used for both steps.
+"""
+
+import sys
+import time
+import argparse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import face_recognition
+import numpy as np
+
+from app.services.face_service import locate_faces, detect_and_encode
+from app.utils.images import load_image_array
+from app.config import settings
+
+
+def _iou(a: tuple, b: tuple) -> float:
+    top, right, bottom, left = max(a[0], b[0]), min(a[1], b[1]), min(a[2], b[2]), max(a[3], b[3])
+    inter = max(0, right - left) * max(0, bottom - top)
+    area_a = (a[1] - a[3]) * (a[2] - a[0])
+    area_b = (b[1] - b[3]) * (b[2] - b[0])
+    union = area_a + area_b - inter
+    return inter / union if union else 0.0
+
+
+def _timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def benchmark(images_dir: Path, max_side: int, model: str, upsample: int, limit: int):
+    image_files = sorted(list(images_dir.glob("*.jpg")) + list(images_dir.glob("*.png")))[:limit]
+    print(f"Images: {len(image_files)}  model={model}  upsample={upsample}  max_side={max_side}")
+    print()
+
+    full_times, small_times = [], []
+    same_count = 0
+    matched_boxes = 0
+    total_boxes = 0
+    distances = []
+
+    for i, img_path in enumerate(image_files, 1):
+        try:
+            image, _ = load_image_array(img_path)
+        except Exception as e:
+            print(f"[{i}/{len(image_files)}] Failed: {img_path.name} - {e}")
+            continue
+
+        full, t_full = _timed(lambda: locate_faces(image, model, upsample, max_side=0))
+        small, t_small = _timed(lambda: locate_faces(image, model, upsample, max_side=max_side))
+        full_times.append(t_full)
+        small_times.append(t_small)
+
+        if len(full) == len(small):
+            same_count += 1
+
+        total_boxes += len(full)
+        if full and small:
+            full_enc = face_recognition.face_encodings(image, full)
+            small_enc = face_recognition.face_encodings(image, small)
+            for box, enc in zip(full, full_enc):
+                best = max(range(len(small)), key=lambda j: _iou(box, small[j]))
+                if _iou(box, small[best]) >= 0.5:
+                    matched_boxes += 1
+                    distances.append(float(np.linalg.norm(enc - small_enc[best])))
+
+        print(
+            f"[{i}/{len(image_files)}] {img_path.name} {image.shape[1]}x{image.shape[0]}: "
+            f"full {t_full * 1000:.0f}ms ({len(full)} faces), "
+            f"downscaled {t_small * 1000:.0f}ms ({len(small)} faces)"
+        )
+
+    if not full_times:
+        return
+
+    print()
+    print(f"Mean full-res detection:   {np.mean(full_times) * 1000:.1f} ms")
+    print(f"Mean downscaled detection: {np.mean(small_times) * 1000:.1f} ms")
+    print(f"Speedup: {np.sum(full_times) / max(np.sum(small_times), 1e-9):.1f}x")
+    print(f"Same face count: {same_count}/{len(full_times)} images")
+    if total_boxes:
+        print(f"Full-res faces recovered (IoU >= 0.5): {matched_boxes}/{total_boxes}")
+    if distances:
+        print(f"Mean encoding distance full vs downscaled: {np.mean(distances):.4f}")
+
+
+def benchmark_pipeline(images_dir: Path, max_side: int, model: str, upsample: int, limit: int):
+    image_files = sorted(list(images_dir.glob("*.jpg")) + list(images_dir.glob("*.png")))[:limit]
+    print(f"Images: {len(image_files)}  model={model}  upsample={upsample}  max_side={max_side}")
+    print()
+
+    settings.face_detection_model = model
+    settings.face_detection_upsample = upsample
+    settings.face_detection_max_side = max_side
+
+    full_times, reduced_times = [], []
+    same_count = 0
+    matched_boxes = 0
+    total_boxes = 0
+    distances = []
+
+    for i, img_path in enumerate(image_files, 1):
+        content = img_path.read_bytes()
+
+        def full_resolution():
+            image, _ = load_image_array(content)
+            locations = locate_faces(image, model, upsample, max_side=max_side)
+            return locations, face_recognition.face_encodings(image, locations)
+
+        try:
+            (full, full_enc), t_full = _timed(full_resolution)
+            (reduced, reduced_enc), t_reduced = _timed(lambda: detect_and_encode(content))
+        except Exception as e:
+            print(f"[{i}/{len(image_files)}] Failed: {img_path.name} - {e}")
+            continue
+        full_times.append(t_full)
+        reduced_times.append(t_reduced)
+
+        if len(full) == len(reduced):
+            same_count += 1
+
+        total_boxes += len(full)
+        if full and reduced:
+            for box, enc in zip(full, full_enc):
+                best = max(range(len(reduced)), key=lambda j: _iou(box, reduced[j]))
+                if _iou(box, reduced[best]) >= 0.5:
+                    matched_boxes += 1
+                    distances.append(float(np.linalg.norm(enc - reduced_enc[best])))
+
+        print(
+            f"[{i}/{len(image_files)}] {img_path.name}: "
+            f"full decode {t_full * 1000:.0f}ms ({len(full)} faces), "
+            f"reduced decode {t_reduced * 1000:.0f}ms ({len(reduced)} faces)"
+        )
+
+    if not full_times:
+        return
+
+    print()
+    print(f"Mean full-decode pipeline:    {np.mean(full_times) * 1000:.1f} ms")
+    print(f"Mean reduced-decode pipeline: {np.mean(reduced_times) * 1000:.1f} ms")
+    print(f"Speedup: {np.sum(full_times) / max(np.sum(reduced_times), 1e-9):.1f}x")
+    print(f"Same face count: {same_count}/{len(full_times)} images")
+    if total_boxes:
+        print(f"Full-decode faces recovered (IoU >= 0.5): {matched_boxes}/{total_boxes}")
+    if distances:
+        print(f"Encoding distance full vs reduced decode: mean {np.mean(distances):.4f}, "
+              f"max {np.max(distances):.4f} (match tolerance {settings.face_recognition_tolerance})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark downscaled face detection")
+    parser.add_argument("--images-dir", type=Path, default=settings.images_dir)
+    parser.add_argument("--max-side", type=int, default=settings.face_detection_max_side or 800)
+    parser.add_argument("--model", default=settings.face_detection_model, choices=["hog", "cnn"])
+    parser.add_argument("--upsample", type=int, default=settings.face_detection_upsample)
+    parser.add_argument("--limit", type=int, default=50, help="Max images to measure")
+    parser.add_argument(
+        "--pipeline",
+        action="store_true",
+        help="Compare detect_and_encode (reduced decode for detection) with a full decode",
+    )
+    args = parser.parse_args()
+
+    run = benchmark_pipeline if args.pipeline else benchmark
+    run(args.images_dir, args.max_side, args.model, args.upsample, args.limit)
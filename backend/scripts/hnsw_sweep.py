@@ -0,0 +1,87 @@
+"""
+Recall-vs-latency sweep of HNSW search breadth (ef) against exact search.
+Queries are stored vectors from the model's collection, slightly perturbed so
+they don't trivially match themselves.
+"""
+
+import sys
+import time
+import argparse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import numpy as np
+
+from app.services.vector_store import vector_store, get_index_config
+from app.models.clip_models import MODEL_REGISTRY, get_collection_name
+from app.config import settings
+
+
+def sample_queries(model_id: str, count: int, noise: float, seed: int) -> list[list[float]]:
+    client = vector_store._get_client()
+    points, _ = client.scroll(
+        collection_name=get_collection_name(model_id),
+        limit=count,
+        with_vectors=True,
+        with_payload=False,
+    )
+    rng = np.random.default_rng(seed)
+    queries = []
+    for point in points:
+        vector = np.asarray(point.vector, dtype=np.float32)
+        vector = vector + rng.normal(0, noise, vector.shape).astype(np.float32)
+        queries.append((vector / np.linalg.norm(vector)).tolist())
+    return queries
+
+
+def timed_search(model_id: str, query: list[float], k: int, **kwargs) -> tuple[set[str], float]:
+    start = time.perf_counter()
+    results = vector_store.search(model_id, query, limit=k, **kwargs)
+    return {r["id"] for r in results}, time.perf_counter() - start
+
+
+def sweep(model_id: str, ef_values: list[int], k: int, queries: int, noise: float, seed: int):
+    info = vector_store.get_collection_info(model_id)
+    if not info or not info["points_count"]:
+        print(f"Collection for {model_id} is empty or missing; index it first.")
+        return
+
+    print(f"Model: {model_id}  points: {info['points_count']}  config: {get_index_config(model_id)}")
+    query_vectors = sample_queries(model_id, queries, noise, seed)
+
+    truth, exact_times = [], []
+    for query in query_vectors:
+        ids, elapsed = timed_search(model_id, query, k, exact=True)
+        truth.append(ids)
+        exact_times.append(elapsed)
+
+    print(f"\n{'ef':>6}  {'recall@' + str(k):>10}  {'p50 ms':>8}  {'p95 ms':>8}")
+    print(f"{'exact':>6}  {1.0:>10.4f}  {np.percentile(exact_times, 50) * 1000:>8.2f}  "
+          f"{np.percentile(exact_times, 95) * 1000:>8.2f}")
+
+    for ef in ef_values:
+        recalls, times = [], []
+        for query, expected in zip(query_vectors, truth):
+            ids, elapsed = timed_search(model_id, query, k, ef=ef)
+            times.append(elapsed)
+            recalls.append(len(ids & expected) / max(len(expected), 1))
+        print(f"{ef:>6}  {np.mean(recalls):>10.4f}  {np.percentile(times, 50) * 1000:>8.2f}  "
+              f"{np.percentile(times, 95) * 1000:>8.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="HNSW ef recall/latency sweep")
+    parser.add_argument(
+        "--model",
+        default=settings.default_clip_model,
+        choices=list(MODEL_REGISTRY.keys()),
+    )
+    parser.add_argument("--ef", nargs="*", type=int, default=[16, 32, 64, 128, 256, 512])
+    parser.add_argument("--k", type=int, default=12, help="Results per query")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--noise", type=float, default=0.02, help="Query perturbation stddev")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    sweep(args.model, args.ef, args.k, args.queries, args.noise, args.seed)
@@ -0,0 +1,89 @@
+"""
+Detect and encode faces in every gallery image and store them in Qdrant.
+Each face gets its own 128-d point with the bounding box in its payload.
+"""
+
+import os
+import sys
+import argparse
+from concurrent.futures import FIRST_COMPLETED, as_completed, wait
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.services.face_service import (
+    face_service,
+    detect_and_encode_with_metrics,
+    build_face_points,
+)
+from app.services.vector_store import vector_store
+from app.services.phash_index import phash_index
+from app.config import settings
+
+
+def index_all_faces(images_dir: Path = None, batch_size: int = 64):
+    images_dir = images_dir or settings.images_dir
+
+    image_files = list(images_dir.glob("*.jpg")) + list(images_dir.glob("*.png"))
+    print(f"Found {len(image_files)} images to scan for faces")
+
+    collection_name = vector_store.ensure_face_collection()
+    print(f"Collection: {collection_name}")
+    print()
+
+    pool = face_service.get_pool()
+    window = (settings.face_workers or os.cpu_count() or 1) * 2
+    futures = {}
+    pending_points = []
+    total_faces = 0
+    done_count = 0
+
+    def collect(done) -> None:
+        nonlocal pending_points, total_faces, done_count
+        for future in done:
+            img_path = futures.pop(future)
+            done_count += 1
+            try:
+                (face_locations, face_encodings), _ = future.result()
+                points = build_face_points(
+                    img_path.name, str(img_path), face_locations, face_encodings
+                )
+                # Drop faces from an earlier run that may no longer be detected.
+                vector_store.delete_faces(img_path.name)
+                pending_points.extend(points)
+                total_faces += len(points)
+                print(f"[{done_count}/{len(image_files)}] {img_path.name}: {len(points)} faces")
+            except Exception as e:
+                print(f"[{done_count}/{len(image_files)}] Failed: {img_path.name} - {e}")
+
+            if len(pending_points) >= batch_size:
+                vector_store.upsert_faces(pending_points)
+                pending_points = []
+
+    for img_path in image_files:
+        duplicate = phash_index.check_and_add(img_path, img_path.name)
+        if duplicate is not None:
+            done_count += 1
+            print(f"Skipped: {img_path.name} (near-duplicate of {duplicate})")
+            continue
+        # Bound in-flight jobs so image bytes don't pile up in the pool's queue.
+        if len(futures) >= window:
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            collect(done)
+        futures[pool.submit(detect_and_encode_with_metrics, img_path.read_bytes())] = img_path
+
+    collect(as_completed(list(futures)))
+
+    vector_store.upsert_faces(pending_points)
+    face_service.shutdown()
+
+    print(f"\nDone! Indexed {total_faces} faces from {len(image_files)} images.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Index gallery faces for face search")
+    parser.add_argument("--images-dir", type=Path, default=None)
+    parser.add_argument("--batch-size", type=int, default=64, help="Points per upsert")
+    args = parser.parse_args()
+
+    index_all_faces(args.images_dir, args.batch_size)
@@ -11,6 +11,8 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from app.services.clip_service import clip_service
 from app.services.vector_store import vector_store
+from app.services.thumbnail_service import thumbnail_service
+from app.services.phash_index import phash_index
 from app.models.clip_models import MODEL_REGISTRY, get_collection_name
 from app.config import settings
 import uuid
@@ -42,6 +44,11 @@ def index_all_images(model_id: str, images_dir: Path = None):
 
     for i, img_path in enumerate(image_files, 1):
         try:
+            duplicate = phash_index.check_and_add(img_path, img_path.name)
+            if duplicate is not None:
+                print(f"[{i}/{len(image_files)}] Skipped: {img_path.name} (near-duplicate of {duplicate})")
+                continue
+
             image_id = str(uuid.uuid4())
             embedding = clip_service.get_image_embedding(img_path, model_id)
 
@@ -54,6 +61,7 @@ def index_all_images(model_id: str, images_dir: Path = None):
                     "path": str(img_path),
                 },
             )
+            thumbnail_service.generate_defaults(img_path)
             print(f"[{i}/{len(image_files)}] Indexed: {img_path.name}")
 
         except Exception as e:
@@ -0,0 +1,50 @@
+"""
+Run the shared model server. Start it once per host, then launch API workers
+with MODEL_SERVER_SOCKET pointing at the same socket, e.g.
+
+    python scripts/model_server.py --socket /tmp/joyuri-models.sock --preload openai/ViT-B-32
+    MODEL_SERVER_SOCKET=/tmp/joyuri-models.sock uvicorn app.main:app --workers 4
+"""
+
+import sys
+import argparse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.config import settings
+from app.models.clip_models import MODEL_REGISTRY
+from app.services.clip_service import MultiModelCLIPService
+from app.services.model_server import ModelServer
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Shared CLIP model server")
+    parser.add_argument(
+        "--socket",
+        default=settings.model_server_socket or "/tmp/joyuri-models.sock",
+        help="Unix socket path",
+    )
+    parser.add_argument(
+        "--preload",
+        nargs="*",
+        default=[settings.default_clip_model],
+        choices=list(MODEL_REGISTRY.keys()),
+        help="Models to load before accepting requests",
+    )
+    args = parser.parse_args()
+
+    service = MultiModelCLIPService()
+    for model_id in args.preload:
+        print(f"Loading {model_id}...")
+        service.load_model(model_id)
+
+    server = ModelServer(args.socket, service)
+    print(f"Model server listening on {args.socket}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        Path(args.socket).unlink(missing_ok=True)
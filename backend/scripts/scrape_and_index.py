@@ -0,0 +1,116 @@
+"""
+Scrape Pinterest and index the downloads in one run.
+Images flow from the download workers straight into batched embedding and
+Qdrant upserts, so they become searchable while scraping continues.
+"""
+
+import sys
+import time
+import asyncio
+import argparse
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.services.clip_service import clip_service
+from app.services.indexing_queue import IndexingQueue, IndexJob
+from app.models.clip_models import MODEL_REGISTRY
+from app.config import settings
+from scripts.scraper.pinterest import PinterestScraper
+from scripts.scraper.state import ScrapeState
+
+
+async def scrape_and_index(
+    url: str,
+    model_id: str,
+    max_images: int = 50,
+    search: bool = False,
+    output_dir: Path = None,
+    concurrency: int = 8,
+    rate_limit: float = 5.0,
+    max_pending: int = 64,
+):
+    output_dir = output_dir or settings.images_dir
+    config = MODEL_REGISTRY[model_id]
+
+    print(f"Loading {config.name}...")
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(None, clip_service.load_model, model_id)
+
+    # A small queue bounds how far indexing may lag behind downloads: when it
+    # is full, on_downloaded blocks and the download workers wait.
+    indexer = IndexingQueue(maxsize=max_pending)
+    indexer.start()
+    job_ids: list[str] = []
+
+    async def on_downloaded(path: Path) -> None:
+        image_id = str(uuid.uuid4())
+        job_ids.append(image_id)
+        await indexer.submit(
+            IndexJob(
+                image_id=image_id,
+                model_id=model_id,
+                path=path,
+                payload={"filename": path.name, "path": str(path)},
+            )
+        )
+
+    scraper = PinterestScraper(
+        output_dir,
+        concurrency=concurrency,
+        rate_limit=rate_limit,
+        state=ScrapeState(settings.scrape_state_file),
+    )
+    start = time.perf_counter()
+    if search:
+        downloaded = await scraper.scrape_search(url, max_images, on_downloaded=on_downloaded)
+    else:
+        downloaded = await scraper.scrape_board(url, max_images, on_downloaded=on_downloaded)
+    scraped_at = time.perf_counter() - start
+
+    await indexer.join()
+    await indexer.stop()
+    total = time.perf_counter() - start
+
+    statuses = [indexer.get_status(image_id) or {} for image_id in job_ids]
+    indexed = sum(1 for s in statuses if s.get("status") == "indexed")
+    for s in statuses:
+        if s.get("status") == "failed":
+            print(f"Failed to index {s['id']}: {s['error']}")
+
+    print(f"\nDownloaded {len(downloaded)} images in {scraped_at:.1f}s")
+    print(f"Indexed {indexed}/{len(job_ids)} with {config.name}, total {total:.1f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scrape Pinterest and index as images arrive")
+    parser.add_argument("url", help="Pinterest board URL or search query")
+    parser.add_argument("--search", action="store_true", help="Treat input as search query")
+    parser.add_argument("--max", type=int, default=50, help="Max images to download")
+    parser.add_argument("--output", type=Path, default=None, help="Output dir")
+    parser.add_argument(
+        "--model",
+        default=settings.default_clip_model,
+        choices=list(MODEL_REGISTRY.keys()),
+        help=f"Model ID to index with (default: {settings.default_clip_model})",
+    )
+    parser.add_argument("--concurrency", type=int, default=8, help="Parallel downloads")
+    parser.add_argument("--rate-limit", type=float, default=5.0, help="Requests/sec per host")
+    parser.add_argument(
+        "--max-pending", type=int, default=64, help="Downloads allowed to wait for indexing"
+    )
+    args = parser.parse_args()
+
+    asyncio.run(
+        scrape_and_index(
+            args.url,
+            args.model,
+            max_images=args.max,
+            search=args.search,
+            output_dir=args.output,
+            concurrency=args.concurrency,
+            rate_limit=args.rate_limit,
+            max_pending=args.max_pending,
+        )
+    )
@@ -9,76 +9,216 @@ import hashlib
 import httpx
 from pathlib import Path
 from playwright.async_api import async_playwright
-from typing import Optional
+from typing import Awaitable, Callable, Optional
+
+from app.config import settings
+from app.services.phash_index import phash_index
+from scripts.scraper.state import ScrapeState, DOWNLOADED, SKIPPED, FAILED
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+class HostRateLimiter:
+    """Spaces out requests to each host to at most ``rate`` per second."""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next_slot: dict[str, float] = {}
+        self._lock = asyncio.Lock()
+
+    async def wait(self, host: str) -> None:
+        if not self.interval:
+            return
+        loop = asyncio.get_running_loop()
+        async with self._lock:
+            now = loop.time()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
 
 
 class PinterestScraper:
-    def __init__(self, output_dir: Path):
+    RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+    def __init__(
+        self,
+        output_dir: Path,
+        concurrency: int = 8,
+        rate_limit: float = 5.0,
+        max_retries: int = 3,
+        backoff: float = 1.0,
+        state: Optional[ScrapeState] = None,
+        stop_after_seen: int = 50,
+    ):
         self.output_dir = output_dir
         self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.state = state
+        self.stop_after_seen = stop_after_seen
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self._rate_limiter = HostRateLimiter(rate_limit)
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """Shared pooled client so connections and TLS sessions are reused."""
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                http2=_http2_available(),
+                follow_redirects=True,
+                timeout=30,
+                limits=httpx.Limits(
+                    max_connections=self.concurrency,
+                    max_keepalive_connections=self.concurrency,
+                ),
+            )
+        return self._client
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
 
     async def scrape_board(
         self,
         board_url: str,
         max_images: int = 50,
         scroll_delay: float = 1.5,
+        on_downloaded: Optional[Callable[[Path], Awaitable[None]]] = None,
     ) -> list[Path]:
         """
         Scrape images from a Pinterest board.
 
+        Downloads run on a bounded pool of workers while the page keeps
+        scrolling. With a ScrapeState, pins finished by earlier runs are
+        skipped, unfinished ones are retried first, and scrolling stops after
+        ``stop_after_seen`` consecutive already-finished pins.
+
         Args:
             board_url: URL of the Pinterest board
             max_images: Maximum number of images to download
             scroll_delay: Delay between scrolls in seconds
+            on_downloaded: Awaited with each new file; a slow consumer
+                holds back the download workers (backpressure)
 
         Returns:
             List of paths to downloaded images
         """
-        downloaded = []
+        downloaded: list[Path] = []
         seen_urls = set()
+        in_flight = 0
+        queue: asyncio.Queue[tuple[str, str]] = asyncio.Queue(maxsize=self.concurrency * 2)
+        state = self.state
+        seen_in_a_row = 0
+
+        async def enqueue(src: str, url: str) -> None:
+            nonlocal in_flight
+            seen_urls.add(src)
+            in_flight += 1
+            if state is not None:
+                state.mark_pending(board_url, src, url)
+            await queue.put((src, url))
+
+        async def worker():
+            nonlocal in_flight
+            while True:
+                src, url = await queue.get()
+                try:
+                    if len(downloaded) < max_images:
+                        status, path, content_hash = await self._download(url)
+                        if state is not None:
+                            state.mark(
+                                board_url, src, status,
+                                filename=path.name if path else None,
+                                content_hash=content_hash,
+                            )
+                        if path and len(downloaded) < max_images:
+                            downloaded.append(path)
+                            print(f"Downloaded {len(downloaded)}/{max_images}: {path.name}")
+                            if on_downloaded is not None:
+                                try:
+                                    await on_downloaded(path)
+                                except Exception as e:
+                                    # Keep the worker alive, or queue.join() never returns.
+                                    print(f"Callback failed for {path.name}: {e}")
+                finally:
+                    in_flight -= 1
+                    queue.task_done()
 
         async with async_playwright() as p:
+            workers = [asyncio.create_task(worker()) for _ in range(self.concurrency)]
             browser = await p.chromium.launch(headless=True)
-            page = await browser.new_page()
-            page.set_default_timeout(60000)
-
-            await page.goto(board_url, wait_until="domcontentloaded")
-            await asyncio.sleep(3)
-
-            while len(downloaded) < max_images:
-                images = await page.query_selector_all('img[src*="pinimg.com"]')
-
-                for img in images:
-                    if len(downloaded) >= max_images:
+            try:
+                page = await browser.new_page()
+                page.set_default_timeout(60000)
+
+                if state is not None:
+                    for src, url in state.unfinished(board_url, self.max_retries):
+                        if len(downloaded) + in_flight >= max_images:
+                            break
+                        print(f"Resuming {url}")
+                        await enqueue(src, url)
+
+                await page.goto(board_url, wait_until="domcontentloaded")
+                await asyncio.sleep(3)
+
+                caught_up = False
+                while len(downloaded) < max_images and not caught_up:
+                    images = await page.query_selector_all('img[src*="pinimg.com"]')
+
+                    for img in images:
+                        # Only queue what could still be needed; failed downloads
+                        # free up room for pins further down the page.
+                        if len(downloaded) + in_flight >= max_images:
+                            break
+
+                        src = await img.get_attribute("src")
+                        if not src or src in seen_urls:
+                            continue
+
+                        if state is not None and state.is_done(board_url, src):
+                            seen_urls.add(src)
+                            seen_in_a_row += 1
+                            if self.stop_after_seen and seen_in_a_row >= self.stop_after_seen:
+                                print(f"Reached {seen_in_a_row} known pins in a row, stopping")
+                                caught_up = True
+                                break
+                            continue
+
+                        seen_in_a_row = 0
+                        await enqueue(src, self._get_high_res_url(src))
+
+                    if caught_up:
                         break
 
-                    src = await img.get_attribute("src")
-                    if not src or src in seen_urls:
-                        continue
+                    await page.evaluate("window.scrollBy(0, 1000)")
+                    await asyncio.sleep(scroll_delay)
 
-                    high_res_url = self._get_high_res_url(src)
-                    seen_urls.add(src)
-
-                    path = await self._download_image(high_res_url)
-                    if path:
-                        downloaded.append(path)
-                        print(f"Downloaded {len(downloaded)}/{max_images}: {path.name}")
-
-                await page.evaluate("window.scrollBy(0, 1000)")
-                await asyncio.sleep(scroll_delay)
-
-                new_height = await page.evaluate("document.body.scrollHeight")
-                if len(images) == 0:
-                    break
+                    if len(images) == 0:
+                        break
 
-            await browser.close()
+                await queue.join()
+            finally:
+                for task in workers:
+                    task.cancel()
+                await asyncio.gather(*workers, return_exceptions=True)
+                await browser.close()
+                await self.aclose()
 
-        return downloaded
+        return downloaded[:max_images]
 
     async def scrape_search(
         self,
         query: str,
         max_images: int = 50,
+        on_downloaded: Optional[Callable[[Path], Awaitable[None]]] = None,
     ) -> list[Path]:
         """
         Scrape images from Pinterest search results.
@@ -86,12 +226,13 @@ class PinterestScraper:
         Args:
             query: Search query (e.g., "jo yuri izone")
             max_images: Maximum number of images to download
+            on_downloaded: See ``scrape_board``
 
         Returns:
             List of paths to downloaded images
         """
         search_url = f"https://www.pinterest.com/search/pins/?q={query.replace(' ', '%20')}"
-        return await self.scrape_board(search_url, max_images)
+        return await self.scrape_board(search_url, max_images, on_downloaded=on_downloaded)
 
     def _get_high_res_url(self, url: str) -> str:
         """Convert thumbnail URL to high-res version."""
@@ -106,38 +247,64 @@ class PinterestScraper:
             return url.replace("/originals/", "/736x/")
         return url
 
-    async def _download_image(
-        self, url: str, original_url: str | None = None, min_size: int = 10_000
-    ) -> Optional[Path]:
-        """Download an image and return its path. Falls back to lower res on 403."""
+    async def _fetch(self, url: str) -> httpx.Response:
+        """GET through the shared client with per-host rate limiting and retries."""
+        client = self._get_client()
+        host = httpx.URL(url).host
+        attempt = 0
+        while True:
+            await self._rate_limiter.wait(host)
+            try:
+                response = await client.get(url)
+            except httpx.TransportError:
+                if attempt >= self.max_retries:
+                    raise
+                delay = self.backoff * 2**attempt
+            else:
+                if response.status_code not in self.RETRY_STATUSES or attempt >= self.max_retries:
+                    response.raise_for_status()
+                    return response
+                retry_after = response.headers.get("retry-after", "")
+                delay = float(retry_after) if retry_after.isdigit() else self.backoff * 2**attempt
+
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    async def _download(
+        self, url: str, min_size: int = 10_000
+    ) -> tuple[str, Optional[Path], Optional[str]]:
+        """Download an image; returns (state status, path, sha256 of the content)."""
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(url, follow_redirects=True, timeout=30)
-                response.raise_for_status()
+            response = await self._fetch(url)
+            content = response.content
 
-                content = response.content
+            if len(content) < min_size:
+                print(f"Skipping {url}: too small ({len(content)} bytes)")
+                return SKIPPED, None, None
 
-                if len(content) < min_size:
-                    print(f"Skipping {url}: too small ({len(content)} bytes)")
-                    return None
+            url_hash = hashlib.md5(url.encode()).hexdigest()[:12]
+            ext = self._get_extension(response.headers.get("content-type", ""))
+            filename = f"{url_hash}{ext}"
+            filepath = self.output_dir / filename
+            content_hash = hashlib.sha256(content).hexdigest()
 
-                url_hash = hashlib.md5(url.encode()).hexdigest()[:12]
-                ext = self._get_extension(response.headers.get("content-type", ""))
-                filename = f"{url_hash}{ext}"
-                filepath = self.output_dir / filename
+            duplicate = await asyncio.to_thread(phash_index.check_and_add, content, filename)
+            if duplicate is not None:
+                print(f"Skipping {url}: near-duplicate of {duplicate}")
+                return SKIPPED, None, content_hash
 
-                filepath.write_bytes(content)
-                return filepath
+            await asyncio.to_thread(filepath.write_bytes, content)
+            return DOWNLOADED, filepath, content_hash
 
         except httpx.HTTPStatusError as e:
             if e.response.status_code == 403 and "/originals/" in url:
                 fallback = self._get_fallback_url(url)
-                return await self._download_image(fallback, original_url=url)
+                return await self._download(fallback, min_size=min_size)
             print(f"Failed to download {url}: {e}")
-            return None
+            return FAILED, None, None
         except Exception as e:
             print(f"Failed to download {url}: {e}")
-            return None
+            return FAILED, None, None
 
     def _get_extension(self, content_type: str) -> str:
         """Get file extension from content type."""
@@ -159,9 +326,23 @@ async def main():
     parser.add_argument("--max", type=int, default=50, help="Max images to download")
     parser.add_argument("--output", type=str, default="data/images", help="Output dir")
     parser.add_argument("--search", action="store_true", help="Treat input as search query")
+    parser.add_argument("--concurrency", type=int, default=8, help="Parallel downloads")
+    parser.add_argument("--rate-limit", type=float, default=5.0, help="Requests/sec per host")
+    parser.add_argument("--no-state", action="store_true", help="Ignore saved scrape state")
+    parser.add_argument(
+        "--stop-after-seen", type=int, default=50,
+        help="Stop after this many already-scraped pins in a row (0 = never)",
+    )
     args = parser.parse_args()
 
-    scraper = PinterestScraper(Path(args.output))
+    state = None if args.no_state else ScrapeState(settings.scrape_state_file)
+    scraper = PinterestScraper(
+        Path(args.output),
+        concurrency=args.concurrency,
+        rate_limit=args.rate_limit,
+        state=state,
+        stop_after_seen=args.stop_after_seen,
+    )
 
     if args.search:
         downloaded = await scraper.scrape_search(args.url, args.max)
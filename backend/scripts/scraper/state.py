@@ -0,0 +1,104 @@
+"""
+Persistent scrape state.
+
+Records every pin seen per board in SQLite so re-runs skip known pins,
+resume interrupted downloads and can stop scrolling once they reach pins
+that were already handled by an earlier run.
+"""
+
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+PENDING = "pending"
+DOWNLOADED = "downloaded"
+SKIPPED = "skipped"
+FAILED = "failed"
+
+# Pins in these states are never fetched again.
+DONE_STATUSES = (DOWNLOADED, SKIPPED)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pins (
+    board TEXT NOT NULL,
+    src_url TEXT NOT NULL,
+    download_url TEXT NOT NULL,
+    status TEXT NOT NULL,
+    filename TEXT,
+    content_hash TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (board, src_url)
+) WITHOUT ROWID;
+"""
+
+
+class ScrapeState:
+    def __init__(self, db_path: Path):
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def status(self, board: str, src_url: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT status FROM pins WHERE board = ? AND src_url = ?",
+                (board, src_url),
+            ).fetchone()
+        return row[0] if row else None
+
+    def is_done(self, board: str, src_url: str) -> bool:
+        return self.status(board, src_url) in DONE_STATUSES
+
+    def unfinished(self, board: str, max_attempts: int = 3) -> list[tuple[str, str]]:
+        """(src_url, download_url) of pins an earlier run queued but never finished."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT src_url, download_url FROM pins "
+                "WHERE board = ? AND status IN (?, ?) AND attempts < ? "
+                "ORDER BY updated_at",
+                (board, PENDING, FAILED, max_attempts),
+            ).fetchall()
+        return [(src, url) for src, url in rows]
+
+    def mark_pending(self, board: str, src_url: str, download_url: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO pins (board, src_url, download_url, status, updated_at) "
+                "VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (board, src_url) DO UPDATE SET status = excluded.status, "
+                "updated_at = excluded.updated_at",
+                (board, src_url, download_url, PENDING, time.time()),
+            )
+
+    def mark(
+        self,
+        board: str,
+        src_url: str,
+        status: str,
+        filename: Optional[str] = None,
+        content_hash: Optional[str] = None,
+    ) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE pins SET status = ?, filename = COALESCE(?, filename), "
+                "content_hash = COALESCE(?, content_hash), attempts = attempts + 1, "
+                "updated_at = ? WHERE board = ? AND src_url = ?",
+                (status, filename, content_hash, time.time(), board, src_url),
+            )
+
+    def counts(self, board: str) -> dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT status, COUNT(*) FROM pins WHERE board = ? GROUP BY status",
+                (board,),
+            ).fetchall()
+        return dict(rows)
@@ -0,0 +1,76 @@
+"""
+Export a model's Qdrant collection to a snapshot directory, or restore one.
+
+    python scripts/snapshot.py export --model openai/ViT-L-14 --out data/snapshots/vit-l
+    python scripts/snapshot.py import --dir data/snapshots/vit-l --workers 8 --recreate
+"""
+
+import sys
+import time
+import argparse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.services.snapshot import export_snapshot, import_snapshot, read_manifest
+from app.services.vector_store import vector_store
+from app.models.clip_models import MODEL_REGISTRY
+from app.config import settings
+
+
+def report(label: str):
+    def progress(done: int) -> None:
+        print(f"\r{label}: {done} points", end="", flush=True)
+    return progress
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Collection snapshot export/import")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = subparsers.add_parser("export", help="Write a collection to disk")
+    export_parser.add_argument(
+        "--model",
+        default=settings.default_clip_model,
+        choices=list(MODEL_REGISTRY.keys()),
+    )
+    export_parser.add_argument("--out", type=Path, required=True, help="Snapshot directory")
+    export_parser.add_argument("--batch-size", type=int, default=1000)
+
+    import_parser = subparsers.add_parser("import", help="Bulk-load a snapshot")
+    import_parser.add_argument("--dir", type=Path, required=True, help="Snapshot directory")
+    import_parser.add_argument(
+        "--model",
+        default=None,
+        choices=list(MODEL_REGISTRY.keys()),
+        help="Target model (defaults to the snapshot's)",
+    )
+    import_parser.add_argument("--batch-size", type=int, default=1000)
+    import_parser.add_argument("--workers", type=int, default=4, help="Parallel upserts")
+    import_parser.add_argument(
+        "--recreate", action="store_true", help="Drop the existing collection first"
+    )
+
+    args = parser.parse_args()
+    start = time.perf_counter()
+
+    if args.command == "export":
+        manifest = export_snapshot(
+            vector_store, args.model, args.out, args.batch_size, report("Exported")
+        )
+        print(f"\nWrote {manifest['count']} points to {args.out}")
+    else:
+        manifest = read_manifest(args.dir)
+        print(f"Snapshot: {manifest['model_id']} ({manifest['count']} points)")
+        loaded = import_snapshot(
+            vector_store,
+            args.dir,
+            model_id=args.model,
+            batch_size=args.batch_size,
+            workers=args.workers,
+            recreate=args.recreate,
+            progress=report("Imported"),
+        )
+        print(f"\nLoaded {loaded} points")
+
+    print(f"Done in {time.perf_counter() - start:.1f}s")
@@ -1,7 +1,7 @@
 "use client";
 
 import { useEffect, useState } from "react";
-import { listImages, getImageUrl, type ImageItem } from "@/lib/api";
+import { listImages, getImageUrl, getThumbnailUrl, type ImageItem } from "@/lib/api";
 import { ImageGrid } from "@/components/ImageGrid";
 
 export default function GalleryPage() {
@@ -43,6 +43,7 @@ export default function GalleryPage() {
       <ImageGrid
         images={images.map((img) => ({
           src: getImageUrl(img.payload.filename),
+          thumbnailSrc: getThumbnailUrl(img.payload.filename),
           filename: img.payload.filename,
         }))}
       />
@@ -1,7 +1,7 @@
 "use client";
 
 import { useState, useCallback } from "react";
-import { searchImages, getImageUrl, listModels, type SearchResult } from "@/lib/api";
+import { searchImages, getImageUrl, getThumbnailUrl, listModels, type SearchResult } from "@/lib/api";
 import { ImageGrid } from "@/components/ImageGrid";
 import { ModelSelector } from "@/components/ModelSelector";
 import { IndexingProgress } from "@/components/IndexingProgress";
@@ -105,6 +105,7 @@ export default function SearchPage() {
           <ImageGrid
             images={results.map((r) => ({
               src: getImageUrl(r.filename),
+              thumbnailSrc: getThumbnailUrl(r.filename),
               filename: r.filename,
               score: r.score,
             }))}
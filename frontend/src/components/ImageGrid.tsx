@@ -4,6 +4,7 @@ import { useState } from "react";
 
 interface ImageItem {
   src: string;
+  thumbnailSrc?: string;
   filename: string;
   score?: number;
 }
@@ -31,8 +32,9 @@ export function ImageGrid({ images }: ImageGridProps) {
             onClick={() => setSelectedImage(image)}
           >
             <img
-              src={image.src}
+              src={image.thumbnailSrc ?? image.src}
               alt={image.filename}
+              loading="lazy"
               className="w-full h-full object-cover transition-transform group-hover:scale-105"
             />
             {image.score !== undefined && (
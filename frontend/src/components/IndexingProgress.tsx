@@ -30,7 +30,7 @@ export function IndexingProgress({
         setProgress({ current: 0, total: data.total || 0, file: "Loading model..." });
       } else if (data.status === "starting") {
         setProgress({ current: 0, total: data.total || 0, file: "" });
-      } else if (data.status === "indexing") {
+      } else if (data.status === "indexing" || data.status === "duplicate") {
         setProgress({
           current: data.current || 0,
           total: data.total || 0,
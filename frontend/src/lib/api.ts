@@ -53,11 +53,19 @@ export interface LoadProgress {
 }
 
 export interface IndexProgress {
-  status: "loading_model" | "starting" | "indexing" | "file_error" | "complete" | "error";
+  status:
+    | "loading_model"
+    | "starting"
+    | "indexing"
+    | "duplicate"
+    | "file_error"
+    | "complete"
+    | "error";
   current?: number;
   total?: number;
   file?: string;
   error?: string;
+  duplicate_of?: string;
 }
 
 export async function searchImages(
@@ -98,6 +106,10 @@ export function getImageUrl(filename: string): string {
   return `${API_URL}/api/images/file/${filename}`;
 }
 
+export function getThumbnailUrl(filename: string, width = 256): string {
+  return `${API_URL}/api/images/file/${filename}?w=${width}`;
+}
+
 export async function listModels(): Promise<ModelInfo[]> {
   const res = await fetch(`${API_URL}/api/models/`);
   if (!res.ok) throw new Error("Failed to list models");